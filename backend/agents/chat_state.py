@@ -0,0 +1,148 @@
+"""
+Chat State - Per-session Gemini chat and project context
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Optional
+from agents.semantic_cache import SemanticCache
+
+
+# Project-context fields surfaced to Gemini, in prefix order, with their
+# rendered label (separator included)
+CONTEXT_PREFIX_FIELDS = (
+    ('framework', 'Framework: '),
+    ('language', 'Language: '),
+    ('deployed_service', 'Deployed Service: '),
+    ('project_path', 'Project Path: ')
+)
+CONTEXT_PREFIX_KEYS = frozenset(key for key, _ in CONTEXT_PREFIX_FIELDS)
+
+
+@dataclass(slots=True)
+class ProjectContext:
+    """Fixed-shape project context for one session (None = not known yet)"""
+    project_path: Optional[str] = None
+    repo_url: Optional[str] = None
+    branch: str = 'main'
+    analysis: Optional[Dict[str, Any]] = None
+    framework: Optional[str] = None
+    language: Optional[str] = None
+    service_name: Optional[str] = None  # Confirmed by the user for this project's last deploy
+    deployed_service: Optional[str] = None
+    deployment_url: Optional[str] = None
+    deployment_id: Optional[str] = None
+
+
+class ContextView:
+    """
+    Read-only view over a live ProjectContext.
+
+    Attribute reads are forwarded to the context (dict fields such as
+    analysis come back as read-only mappings of their top level); writes
+    raise, so updates go through set_context and keep the rendered prefix
+    current. The view is built once per session, so reads allocate nothing
+    beyond those mapping proxies.
+    """
+    __slots__ = ('_context',)
+
+    def __init__(self, context: ProjectContext):
+        object.__setattr__(self, '_context', context)
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._context, name)
+        return MappingProxyType(value) if isinstance(value, dict) else value
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f'Project context is read-only; cannot set {name!r}')
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f'Project context is read-only; cannot delete {name!r}')
+
+    def __repr__(self) -> str:
+        return f'ContextView({self._context!r})'
+
+
+class SessionState:
+    """
+    Chat session and project context for one user session.
+
+    The prefix sent to Gemini is rendered when a field it shows changes, so
+    reading it on every turn is a plain attribute access.
+    """
+
+    def __init__(self):
+        self.chat = None  # Gemini ChatSession, started on the first turn
+        self.sent_context = ''  # Last context prefix sent in this chat
+        self.history_tokens = 0  # Prompt tokens Gemini counted for the last turn
+        self.last_used = time.monotonic()
+
+        # Plain-text replies to near-duplicate messages ("show my repos"),
+        # only ever served back within this same conversation
+        self.response_cache = SemanticCache(max_entries=64)
+
+        self.context = ProjectContext()
+        self.context_view = ContextView(self.context)
+        self.context_prefix = ''
+
+    def set_context(self, **fields):
+        """Set context fields, re-rendering the prefix when it changes"""
+        context = self.context
+        prefix_changed = False
+        for key, value in fields.items():
+            # Only prefix fields whose value actually changed (not e.g. a new
+            # deployment_id or a redeploy of the same service) affect the prefix
+            if key in CONTEXT_PREFIX_KEYS and getattr(context, key) != value:
+                prefix_changed = True
+            setattr(context, key, value)  # Unknown fields raise AttributeError
+
+        if prefix_changed:
+            self._recompute_prefix()
+
+    def _recompute_prefix(self):
+        """Render the context prefix from the set fields"""
+        context = self.context
+        context_parts = []
+        for key, label in CONTEXT_PREFIX_FIELDS:
+            value = getattr(context, key)
+            if value is not None:
+                context_parts.append(label + str(value))
+
+        self.context_prefix = "Current project context: " + ", ".join(context_parts) if context_parts else ""
+
+
+class SessionStore:
+    """
+    Bounded map of session_id -> SessionState.
+
+    Sessions idle for longer than ttl_seconds start over; beyond
+    max_sessions the least recently used session is dropped.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: 'OrderedDict[str, SessionState]' = OrderedDict()
+
+    def get(self, session_id: str) -> SessionState:
+        """Return the session's state, creating it if missing or expired"""
+        now = time.monotonic()
+        state = self._sessions.get(session_id)
+        if state is None or now - state.last_used > self.ttl_seconds:
+            state = self._sessions[session_id] = SessionState()
+        self._sessions.move_to_end(session_id)
+        state.last_used = now
+
+        # Oldest first: drop expired sessions and any over the cap
+        while len(self._sessions) > 1:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_used <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+        return state
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -3,11 +3,136 @@ Code Analyzer Agent - Framework and dependency detection
 """
 
 import os
-import json
 import re
+import uuid
+import asyncio
+import hashlib
+import functools
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-import google.generativeai as genai
+from typing import Awaitable, Callable, Dict, List, Optional
+import diskcache
+import orjson
+from agents.gemini_client import get_model
+
+
+# Cached Gemini analyses expire after a day
+CACHE_TTL_SECONDS = 86400
+
+# Per-tier request options. The SDK has no service tier field, so tiers
+# map to deadlines: interactive ('priority') calls fail fast into the static
+# fallback, while bulk ('flex') calls tolerate a congested endpoint.
+SERVICE_TIERS = {
+    'priority': {'timeout': 30},
+    'standard': {'timeout': 120},
+    'flex': {'timeout': 600},
+}
+
+# Concurrent directory listings during project scans
+SCAN_WORKERS = 16
+
+# Directories never descended into during scans
+EXCLUDE_DIRS = frozenset({
+    'node_modules', 'venv', '__pycache__', '.git',
+    'dist', 'build', 'target', 'vendor'
+})
+
+# File names recorded as configuration files
+CONFIG_PATTERNS = frozenset({
+    'package.json', 'requirements.txt', 'go.mod', 'pom.xml',
+    'Gemfile', 'composer.json', '.env', 'Dockerfile',
+    'docker-compose.yml', 'app.yaml', 'cloudbuild.yaml'
+})
+
+# Gemini sees top-level file paths plus an extension histogram of the rest
+MAX_PROMPT_ROOT_FILES = 50
+MAX_PROMPT_EXTENSIONS = 20
+
+# Static fallback detection: manifest -> (language, build tool,
+# dependency -> framework), checked in order
+FRAMEWORK_MARKERS = {
+    'package.json': ('nodejs', 'npm', {'express': 'express', 'next': 'nextjs', 'fastify': 'fastify'}),
+    'requirements.txt': ('python', 'pip', {'django': 'django', 'fastapi': 'fastapi', 'flask': 'flask'}),
+    'go.mod': ('golang', 'go', {'github.com/gin-gonic/gin': 'gin'})
+}
+
+# Completed top-level string fields in a partially streamed analysis
+PARTIAL_FIELD_PATTERN = re.compile(rb'"(language|framework)"\s*:\s*"([^"]*)"')
+
+# Package name at the start of a requirements.txt line
+REQUIREMENT_NAME_PATTERN = re.compile(r'[ \t]*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+# Source extensions used by the static fallback when no manifest is found
+EXTENSION_LANGUAGES = {
+    '.py': 'python', '.js': 'nodejs', '.ts': 'nodejs', '.go': 'golang',
+    '.java': 'java', '.rb': 'ruby', '.php': 'php'
+}
+
+# Config files this large are left out of the analysis prompt
+MAX_CONFIG_FILE_BYTES = 50000
+
+# KEY=value assignments in .env lines (comments and blank lines never match)
+ENV_VAR_PATTERN = re.compile(r'[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)[ \t]*=')
+
+# .env scanning stops after this many lines per file or keys overall
+MAX_ENV_FILE_LINES = 10000
+MAX_ENV_VARS = 500
+
+# Batch prediction requires a stable (non-experimental) model version
+BATCH_MODEL = 'gemini-2.0-flash-001'
+
+# Response schema for analyses; Gemini returns JSON conforming to it
+ANALYSIS_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'language': {'type': 'STRING'},
+        'framework': {'type': 'STRING'},
+        'entry_point': {'type': 'STRING'},
+        'port': {'type': 'INTEGER'},
+        'dependencies': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'name': {'type': 'STRING'},
+                    'version': {'type': 'STRING'},
+                },
+                'required': ['name'],
+            },
+        },
+        'database': {'type': 'STRING'},
+        'build_tool': {'type': 'STRING'},
+        'start_command': {'type': 'STRING'},
+        'recommendations': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'warnings': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+    },
+    'required': ['language', 'framework', 'entry_point', 'port', 'build_tool', 'start_command'],
+}
+
+ANALYSIS_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': ANALYSIS_SCHEMA,
+}
+
+# Static instructions are set once as the model's system instruction, so
+# per-request prompts only carry project-specific content
+ANALYSIS_INSTRUCTIONS = """
+Analyze this software project and return its deployment information.
+
+- language: python|nodejs|golang|java|ruby|php
+- framework: express|flask|django|fastapi|nextjs|gin|springboot|rails
+- entry_point: main file (e.g., app.py, index.js, main.go)
+- database: postgresql|mysql|mongodb|redis|none
+- build_tool: npm|pip|go|maven|gradle|bundle
+- recommendations / warnings: short deployment notes
+"""
+
+
+def _extension(name: str) -> str:
+    """File extension including the dot ('' if none), as os.path.splitext"""
+    dot = name.rfind('.')
+    return name[dot:] if dot > 0 and name[:dot].strip('.') else ''
 
 
 class CodeAnalyzerAgent:
@@ -16,163 +141,384 @@ class CodeAnalyzerAgent:
     and dependency analysis.
     """
     
-    def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+    def __init__(self, gemini_api_key: str, service_tier: str = 'standard'):
+        if service_tier not in SERVICE_TIERS:
+            raise ValueError(f'Unknown service tier: {service_tier}')
+        
+        self.model = get_model(gemini_api_key, system_instruction=ANALYSIS_INSTRUCTIONS)
+        self.service_tier = service_tier
+        
+        # Content-addressed cache of Gemini responses, keyed by prompt hash
+        self.cache = diskcache.Cache(
+            os.getenv('GEMINI_CACHE_DIR', '.gemini_cache'),
+            eviction_policy='least-recently-used'
+        )
     
-    async def analyze_project(self, project_path: str) -> Dict:
-        """Analyze project structure and configuration"""
+    async def analyze_project(
+        self,
+        project_path: str,
+        service_tier: Optional[str] = None,
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict:
+        """
+        Analyze project structure and configuration
+        
+        Args:
+            project_path: Local path to the project
+            service_tier: Override the agent's default tier for this call
+            on_partial: Awaited once with {'language', 'framework'} as soon as
+                both arrive in the streamed response, before it completes
+        """
+        
+        service_tier = service_tier or self.service_tier
+        if service_tier not in SERVICE_TIERS:
+            raise ValueError(f'Unknown service tier: {service_tier}')
         
         project_path = Path(project_path)
         
         if not project_path.exists():
             return {'error': 'Project path does not exist'}
         
-        # Gather file information
-        file_structure = self._scan_directory(project_path)
+        # Gather file information (off the event loop - large repos take seconds)
+        file_structure = await asyncio.to_thread(self._scan_directory, project_path)
         
         # Use Gemini to intelligently analyze the project
-        analysis_prompt = self._build_analysis_prompt(file_structure, project_path)
+        analysis_prompt = await self._build_analysis_prompt(file_structure, project_path)
+        
+        cache_key = self._cache_key(analysis_prompt)
         
         try:
-            response = await self.model.generate_content_async(analysis_prompt)
+            analysis = self.cache.get(cache_key)
+            
+            if analysis is not None:
+                print("[CodeAnalyzer] Cache hit, skipping Gemini request")
+            else:
+                response = await self.model.generate_content_async(
+                    analysis_prompt,
+                    generation_config=ANALYSIS_GENERATION_CONFIG,
+                    request_options=SERVICE_TIERS[service_tier],
+                    stream=True
+                )
+                
+                # Accumulate the streamed JSON, surfacing language/framework
+                # as soon as both values are complete
+                buffer = bytearray()
+                partial = {}
+                async for chunk in response:
+                    buffer += self._chunk_text(chunk).encode()
+                    if on_partial and len(partial) < 2:
+                        partial = {
+                            field.decode(): value.decode()
+                            for field, value in PARTIAL_FIELD_PATTERN.findall(buffer)
+                        }
+                        if len(partial) == 2:
+                            await on_partial(partial)
+                
+                usage = getattr(response, 'usage_metadata', None)
+                if usage and usage.cached_content_token_count:
+                    print(f"[CodeAnalyzer] Prefix cache hit: {usage.cached_content_token_count} tokens")
+                
+                if not buffer.strip():
+                    print("[CodeAnalyzer] No text in Gemini response, using fallback")
+                    return await asyncio.to_thread(self._fallback_analysis, project_path, file_structure)
+                
+                analysis = self._parse_analysis(buffer.decode())
+                self.cache.set(cache_key, analysis, expire=CACHE_TTL_SECONDS)
+            
+            return await self._enhance_analysis(analysis, project_path)
+        
+        except Exception as e:
+            print(f"[CodeAnalyzer] Error: {str(e)}")
+            # Fallback to static analysis
+            return await asyncio.to_thread(self._fallback_analysis, project_path, file_structure)
+    
+    async def analyze_projects_batch(
+        self,
+        project_paths: List[str],
+        poll_interval: float = 30.0
+    ) -> List[Dict]:
+        """
+        Analyze many projects with a single Vertex AI batch prediction job.
+        
+        Batch jobs cost half the real-time price but may take up to 24h,
+        so this is meant for bulk sweeps (CI, org-wide scans), not
+        interactive requests. Results come back in the order of
+        project_paths, in the same shape analyze_project returns.
+        
+        Requires GOOGLE_CLOUD_PROJECT and GEMINI_BATCH_BUCKET (gs://...).
+        """
+        import vertexai
+        from vertexai.batch_prediction import BatchPredictionJob
+        from google.cloud import storage
+        
+        gcp_project = os.getenv('GOOGLE_CLOUD_PROJECT')
+        bucket_uri = os.getenv('GEMINI_BATCH_BUCKET')
+        if not gcp_project or not bucket_uri:
+            raise ValueError('GOOGLE_CLOUD_PROJECT and GEMINI_BATCH_BUCKET environment variables required')
+        
+        results: Dict[int, Dict] = {}
+        pending: Dict[str, List] = {}  # prompt -> [(index, path, file_structure, cache_key)]
+        
+        for index, raw_path in enumerate(project_paths):
+            project_path = Path(raw_path)
+            if not project_path.exists():
+                results[index] = {'error': 'Project path does not exist'}
+                continue
+            
+            file_structure = await asyncio.to_thread(self._scan_directory, project_path)
+            prompt = await self._build_analysis_prompt(file_structure, project_path)
+            cache_key = self._cache_key(prompt)
             
-            # Properly extract text from Gemini response
-            response_text = None
-            if hasattr(response, 'text') and response.text:
-                response_text = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                parts = response.candidates[0].content.parts
-                if parts:
-                    response_text = ''.join([part.text for part in parts if hasattr(part, 'text')])
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                results[index] = await self._enhance_analysis(cached, project_path)
+            else:
+                pending.setdefault(prompt, []).append((index, project_path, file_structure, cache_key))
+        
+        if pending:
+            bucket_name, _, prefix = bucket_uri.removeprefix('gs://').partition('/')
+            job_prefix = f"{prefix.rstrip('/')}/servergem-batch/{uuid.uuid4().hex[:12]}".lstrip('/')
+            
+            rows = b'\n'.join(
+                orjson.dumps({'request': {
+                    'systemInstruction': {'parts': [{'text': ANALYSIS_INSTRUCTIONS}]},
+                    'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                    'generationConfig': {
+                        'responseMimeType': 'application/json',
+                        'responseSchema': ANALYSIS_SCHEMA,
+                    },
+                }})
+                for prompt in pending
+            )
             
-            if not response_text:
-                print("[CodeAnalyzer] No text in Gemini response, using fallback")
-                return self._fallback_analysis(project_path, file_structure)
+            storage_client = storage.Client(project=gcp_project)
+            bucket = storage_client.bucket(bucket_name)
+            await asyncio.to_thread(
+                bucket.blob(f'{job_prefix}/input.jsonl').upload_from_string,
+                rows,
+                content_type='application/jsonl'
+            )
             
-            # Extract JSON from response (handle markdown code blocks)
-            response_text = response_text.strip()
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0].strip()
+            vertexai.init(project=gcp_project, location=os.getenv('GOOGLE_CLOUD_REGION', 'us-central1'))
+            job = await asyncio.to_thread(
+                BatchPredictionJob.submit,
+                source_model=BATCH_MODEL,
+                input_dataset=f'gs://{bucket_name}/{job_prefix}/input.jsonl',
+                output_uri_prefix=f'gs://{bucket_name}/{job_prefix}/output'
+            )
+            print(f"[CodeAnalyzer] Submitted batch job {job.resource_name} for {len(pending)} prompts")
             
-            analysis = json.loads(response_text)
+            while not job.has_ended:
+                await asyncio.sleep(poll_interval)
+                await asyncio.to_thread(job.refresh)
             
-            # Enhance with static analysis
-            analysis['env_vars'] = self._extract_env_vars(project_path)
-            analysis['dockerfile_exists'] = (project_path / 'Dockerfile').exists()
+            if job.has_succeeded:
+                output_prefix = job.output_location.removeprefix(f'gs://{bucket_name}/')
+                blobs = await asyncio.to_thread(lambda: list(bucket.list_blobs(prefix=output_prefix)))
+                
+                for blob in blobs:
+                    if not blob.name.endswith('.jsonl'):
+                        continue
+                    content = await asyncio.to_thread(blob.download_as_bytes)
+                    for line in content.splitlines():
+                        if not line.strip():
+                            continue
+                        row = orjson.loads(line)
+                        prompt = row['request']['contents'][0]['parts'][0]['text']
+                        entries = pending.pop(prompt, [])
+                        try:
+                            parts = row['response']['candidates'][0]['content']['parts']
+                            analysis = self._parse_analysis(''.join(part.get('text', '') for part in parts))
+                        except Exception as e:
+                            print(f"[CodeAnalyzer] Batch row failed: {str(e)}")
+                            for index, project_path, file_structure, _ in entries:
+                                results[index] = await asyncio.to_thread(
+                                    self._fallback_analysis, project_path, file_structure
+                                )
+                            continue
+                        
+                        for index, project_path, _, cache_key in entries:
+                            self.cache.set(cache_key, analysis, expire=CACHE_TTL_SECONDS)
+                            results[index] = await self._enhance_analysis(dict(analysis), project_path)
+            else:
+                print(f"[CodeAnalyzer] Batch job failed: {job.state}")
             
-            return analysis
+            # Anything the job did not answer falls back to static analysis
+            for entries in pending.values():
+                for index, project_path, file_structure, _ in entries:
+                    results[index] = await asyncio.to_thread(
+                        self._fallback_analysis, project_path, file_structure
+                    )
         
-        except Exception as e:
-            print(f"[CodeAnalyzer] Error: {str(e)}")
-            # Fallback to static analysis
-            return self._fallback_analysis(project_path, file_structure)
+        return [results[index] for index in range(len(project_paths))]
     
     def _scan_directory(self, path: Path, max_depth: int = 3) -> Dict:
         """Scan directory structure (exclude node_modules, venv, etc.)"""
         
-        exclude_dirs = {
-            'node_modules', 'venv', '__pycache__', '.git', 
-            'dist', 'build', 'target', 'vendor'
-        }
-        
         structure = {
             'files': [],
-            'directories': [],
-            'config_files': []
+            'config_files': [],
+            'extensions': Counter()
         }
         
-        config_patterns = [
-            'package.json', 'requirements.txt', 'go.mod', 'pom.xml',
-            'Gemfile', 'composer.json', '.env', 'Dockerfile',
-            'docker-compose.yml', 'app.yaml', 'cloudbuild.yaml'
-        ]
+        # Breadth-first walk that never descends into excluded directories;
+        # every directory of a level is listed concurrently so the readdir
+        # syscalls overlap. pool.map keeps the output order deterministic.
+        list_directory = functools.partial(self._list_directory, exclude_dirs=EXCLUDE_DIRS)
+        level = [(str(path), '')]
         
-        for item in path.rglob('*'):
-            # Skip excluded directories
-            if any(excluded in item.parts for excluded in exclude_dirs):
-                continue
-            
-            if item.is_file():
-                rel_path = str(item.relative_to(path))
-                structure['files'].append(rel_path)
-                
-                if item.name in config_patterns:
-                    structure['config_files'].append(rel_path)
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix='scan') as pool:
+            while level:
+                next_level = []
+                for subdirs, files in pool.map(list_directory, level):
+                    next_level.extend(subdirs)
+                    if not files:
+                        continue
+                    
+                    # Bulk per-directory updates keep the per-file loop in C
+                    names, rel_paths = zip(*files)
+                    structure['files'].extend(rel_paths)
+                    structure['extensions'].update(map(_extension, names))
+                    structure['config_files'].extend(
+                        rel_path for name, rel_path in files if name in CONFIG_PATTERNS
+                    )
+                level = next_level
         
         return structure
     
-    def _build_analysis_prompt(self, file_structure: Dict, project_path: Path) -> str:
+    @staticmethod
+    def _list_directory(directory: tuple, exclude_dirs: frozenset) -> tuple:
+        """List one directory: returns (subdirectories to walk, files)"""
+        
+        current_dir, rel_dir = directory
+        subdirs = []
+        files = []
+        
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_dir}{entry.name}"
+                    
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in exclude_dirs:
+                            subdirs.append((entry.path, f"{rel_path}/"))
+                    elif entry.is_file():
+                        files.append((entry.name, rel_path))
+        except OSError:
+            pass
+        
+        return subdirs, files
+    
+    async def _build_analysis_prompt(self, file_structure: Dict, project_path: Path) -> str:
         """Build analysis prompt for Gemini"""
         
-        # Read key configuration files
-        config_contents = {}
-        for config_file in file_structure['config_files'][:10]:  # Limit to first 10
-            try:
-                full_path = project_path / config_file
-                if full_path.stat().st_size < 50000:  # Only read files < 50KB
-                    config_contents[config_file] = full_path.read_text()
-            except:
-                continue
+        # Read key configuration files concurrently, off the event loop
+        config_files = file_structure['config_files'][:10]  # Limit to first 10
+        contents = await asyncio.gather(*(
+            asyncio.to_thread(self._read_config_file, project_path / config_file)
+            for config_file in config_files
+        ))
+        config_contents = {
+            config_file: content
+            for config_file, content in zip(config_files, contents)
+            if content is not None
+        }
         
-        prompt = f"""
-Analyze this software project and return a JSON object with deployment information.
-
-**File Structure:**
-{json.dumps(file_structure, indent=2)}
+        # Full path lists run to thousands of entries on real repos; the
+        # top-level files and extension counts carry the useful signal
+        files = file_structure['files']
+        summary = {
+            'config_files': file_structure['config_files'],
+            'root_files': [f for f in files if '/' not in f][:MAX_PROMPT_ROOT_FILES],
+            'extensions': dict(file_structure['extensions'].most_common(MAX_PROMPT_EXTENSIONS)),
+            'total_files': len(files)
+        }
+        
+        prompt = f"""**File Structure:**
+{orjson.dumps(summary, option=orjson.OPT_INDENT_2).decode()}
 
 **Configuration Files:**
-{json.dumps(config_contents, indent=2)}
-
-**Return JSON in this exact format:**
-{{
-  "language": "python|nodejs|golang|java|ruby|php",
-  "framework": "express|flask|django|fastapi|nextjs|gin|springboot|rails",
-  "entry_point": "main file (e.g., app.py, index.js, main.go)",
-  "port": 8080,
-  "dependencies": [
-    {{"name": "package-name", "version": "1.0.0"}}
-  ],
-  "database": "postgresql|mysql|mongodb|redis|none",
-  "build_tool": "npm|pip|go|maven|gradle|bundle",
-  "start_command": "command to start the application",
-  "recommendations": [
-    "deployment recommendation 1",
-    "deployment recommendation 2"
-  ],
-  "warnings": [
-    "potential issue 1",
-    "potential issue 2"
-  ]
-}}
-
-Return ONLY valid JSON, no markdown or explanations.
+{orjson.dumps(config_contents, option=orjson.OPT_INDENT_2).decode()}
 """
         
         return prompt
     
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Text of one streamed Gemini chunk (empty if it carries none)"""
+        
+        if not getattr(chunk, 'candidates', None):
+            return ''
+        parts = chunk.candidates[0].content.parts
+        return ''.join(part.text for part in parts if hasattr(part, 'text'))
+    
+    @staticmethod
+    def _cache_key(prompt: str) -> str:
+        """Hash a prompt together with the system instruction it is sent with"""
+        return hashlib.sha256((ANALYSIS_INSTRUCTIONS + prompt).encode()).hexdigest()
+    
+    def _parse_analysis(self, response_text: str) -> Dict:
+        """Parse Gemini's analysis JSON (strips stray markdown code blocks)"""
+        
+        response_text = response_text.strip()
+        if '```json' in response_text:
+            response_text = response_text.split('```json')[1].split('```')[0].strip()
+        elif '```' in response_text:
+            response_text = response_text.split('```')[1].split('```')[0].strip()
+        
+        return orjson.loads(response_text)
+    
+    @staticmethod
+    def _read_config_file(full_path: Path) -> Optional[str]:
+        """Read a configuration file, skipping anything 50KB or larger"""
+        
+        # Capped read instead of stat + read_text: one pass, bounded memory
+        try:
+            with open(full_path, 'rb') as f:
+                data = f.read(MAX_CONFIG_FILE_BYTES)
+        except OSError:
+            return None
+        
+        if len(data) >= MAX_CONFIG_FILE_BYTES:
+            return None
+        
+        return data.decode('utf-8', 'replace')
+    
+    async def _enhance_analysis(self, analysis: Dict, project_path: Path) -> Dict:
+        """Enhance Gemini's analysis with static analysis"""
+        
+        # Optional schema fields may be left out of the response; callers
+        # rely on the lists always being present
+        for key in ('dependencies', 'recommendations', 'warnings'):
+            analysis.setdefault(key, [])
+        
+        analysis['env_vars'] = await asyncio.to_thread(self._extract_env_vars, project_path)
+        analysis['dockerfile_exists'] = (project_path / 'Dockerfile').exists()
+        
+        return analysis
+    
     def _extract_env_vars(self, project_path: Path) -> List[str]:
         """Extract environment variables from .env files"""
         
-        env_vars = []
+        env_vars = set()
         env_files = ['.env', '.env.example', '.env.sample']
         
         for env_file in env_files:
             env_path = project_path / env_file
             if env_path.exists():
                 try:
-                    content = env_path.read_text()
-                    for line in content.split('\n'):
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            var_name = line.split('=')[0].strip()
-                            env_vars.append(var_name)
+                    # Stream lines rather than slurping large committed examples
+                    with env_path.open('r', errors='ignore') as f:
+                        for line_number, line in enumerate(f):
+                            if line_number >= MAX_ENV_FILE_LINES or len(env_vars) >= MAX_ENV_VARS:
+                                break
+                            match = ENV_VAR_PATTERN.match(line)
+                            if match:
+                                env_vars.add(match.group(1))
                 except:
                     continue
         
-        return list(set(env_vars))  # Remove duplicates
+        return list(env_vars)
     
     def _fallback_analysis(self, project_path: Path, file_structure: Dict) -> Dict:
         """Fallback static analysis if Gemini fails"""
@@ -192,39 +538,66 @@ Return ONLY valid JSON, no markdown or explanations.
             'warnings': ['Automated analysis failed - using fallback detection']
         }
         
-        # Basic detection logic
-        if 'package.json' in file_structure['config_files']:
-            analysis['language'] = 'nodejs'
-            analysis['build_tool'] = 'npm'
-            try:
-                pkg = json.loads((project_path / 'package.json').read_text())
-                deps = pkg.get('dependencies', {})
-                if 'express' in deps:
-                    analysis['framework'] = 'express'
-                elif 'next' in deps:
-                    analysis['framework'] = 'nextjs'
-            except:
-                pass
-        
-        elif 'requirements.txt' in file_structure['config_files']:
-            analysis['language'] = 'python'
-            analysis['build_tool'] = 'pip'
+        # Basic detection logic: first manifest found decides the stack
+        config_files = set(file_structure['config_files'])
+        manifest = next((name for name in FRAMEWORK_MARKERS if name in config_files), None)
+        
+        if manifest:
+            language, build_tool, framework_probes = FRAMEWORK_MARKERS[manifest]
+            analysis['language'] = language
+            analysis['build_tool'] = build_tool
             
-            # Check for Flask/Django/FastAPI
-            for py_file in ['app.py', 'main.py', 'manage.py']:
-                if py_file in file_structure['files']:
-                    analysis['entry_point'] = py_file
+            deps = self._dependency_names(project_path / manifest)
+            for dep, framework in framework_probes.items():
+                if dep in deps:
+                    analysis['framework'] = framework
+                    break
+            
+            if language == 'python':
+                files = set(file_structure['files'])
+                for py_file in ['app.py', 'main.py', 'manage.py']:
+                    if py_file in files:
+                        analysis['entry_point'] = py_file
+                        break
+            elif language == 'golang':
+                analysis['entry_point'] = 'main.go'
+        else:
+            # No manifest: go by the most common source extension
+            for extension, _ in file_structure['extensions'].most_common():
+                if extension in EXTENSION_LANGUAGES:
+                    analysis['language'] = EXTENSION_LANGUAGES[extension]
                     break
-        
-        elif 'go.mod' in file_structure['config_files']:
-            analysis['language'] = 'golang'
-            analysis['build_tool'] = 'go'
-            analysis['entry_point'] = 'main.go'
         
         analysis['env_vars'] = self._extract_env_vars(project_path)
         analysis['dockerfile_exists'] = (project_path / 'Dockerfile').exists()
         
         return analysis
+    
+    @staticmethod
+    def _dependency_names(manifest_path: Path) -> set:
+        """Dependency names declared in a package.json, requirements.txt or go.mod"""
+        
+        try:
+            if manifest_path.name == 'package.json':
+                return set(orjson.loads(manifest_path.read_bytes()).get('dependencies', {}))
+            
+            lines = manifest_path.read_text(errors='ignore').splitlines()
+        except Exception:
+            return set()
+        
+        if manifest_path.name == 'requirements.txt':
+            matches = (REQUIREMENT_NAME_PATTERN.match(line) for line in lines)
+            return {match.group(1).lower() for match in matches if match}
+        
+        # go.mod: module paths in single-line and block require directives
+        names = set()
+        for line in lines:
+            tokens = line.split()
+            if tokens and tokens[0] == 'require':
+                tokens = tokens[1:]
+            if len(tokens) >= 2 and '.' in tokens[0]:
+                names.add(tokens[0])
+        return names
 
 
 # Test analyzer
@@ -267,7 +640,7 @@ SECRET_KEY=mysecret
     print("🔍 Analyzing project...\n")
     analysis = await analyzer.analyze_project(temp_dir)
     
-    print(json.dumps(analysis, indent=2))
+    print(orjson.dumps(analysis, option=orjson.OPT_INDENT_2).decode())
     
     # Cleanup
     import shutil
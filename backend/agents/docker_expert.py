@@ -2,27 +2,43 @@
 Docker Expert Agent - Optimized Dockerfile generation
 """
 
+import os
+import hashlib
+import functools
+import string
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict
-import google.generativeai as genai
+import diskcache
+from agents.gemini_client import get_model
 
 
-class DockerExpertAgent:
-    """
-    Generates production-optimized Dockerfiles using Gemini
-    and pre-built templates for common frameworks.
-    """
-    
-    def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.templates = self._load_templates()
-    
-    def _load_templates(self) -> Dict[str, str]:
-        """Production-optimized Dockerfile templates"""
-        
-        return {
-            'python_flask': """# Multi-stage build for Flask
+# Cached Gemini Dockerfiles expire after a day
+CACHE_TTL_SECONDS = 86400
+
+# In-process LRU of custom Dockerfiles, in front of the disk cache
+MEMORY_CACHE_SIZE = 1024
+
+# Static requirements go first so every custom Dockerfile prompt shares the
+# same prefix and qualifies for Gemini's implicit prefix caching
+DOCKERFILE_INSTRUCTIONS = """
+Generate a production-optimized Dockerfile for Google Cloud Run with these requirements:
+
+**Requirements:**
+1. Multi-stage build to minimize image size
+2. Non-root user for security
+3. Use PORT environment variable (Cloud Run requirement)
+4. Layer caching optimization
+5. Production-ready configuration
+6. Include helpful comments
+
+Return ONLY the Dockerfile content, no markdown formatting.
+"""
+
+
+# Production-optimized Dockerfile sources, keyed by language_framework
+_TEMPLATE_SOURCES = {
+    'python_flask': """# Multi-stage build for Flask
 FROM python:3.11-slim AS builder
 WORKDIR /app
 COPY requirements.txt .
@@ -38,8 +54,8 @@ ENV PATH=/home/appuser/.local/bin:$PATH PORT=8080
 EXPOSE 8080
 CMD exec gunicorn --bind :$PORT --workers 1 --threads 8 --timeout 0 {entry_point}:app
 """,
-            
-            'python_fastapi': """# Multi-stage build for FastAPI
+    
+    'python_fastapi': """# Multi-stage build for FastAPI
 FROM python:3.11-slim AS builder
 WORKDIR /app
 COPY requirements.txt .
@@ -55,8 +71,8 @@ ENV PATH=/home/appuser/.local/bin:$PATH PORT=8080
 EXPOSE 8080
 CMD ["uvicorn", "{entry_point}:app", "--host", "0.0.0.0", "--port", "8080"]
 """,
-            
-            'nodejs_express': """# Multi-stage build for Express
+    
+    'nodejs_express': """# Multi-stage build for Express
 FROM node:18-alpine AS builder
 WORKDIR /app
 COPY package*.json ./
@@ -72,8 +88,8 @@ ENV PORT=8080 NODE_ENV=production
 EXPOSE 8080
 CMD ["node", "{entry_point}"]
 """,
-            
-            'nodejs_nextjs': """# Multi-stage build for Next.js
+    
+    'nodejs_nextjs': """# Multi-stage build for Next.js
 FROM node:18-alpine AS deps
 WORKDIR /app
 COPY package*.json ./
@@ -96,8 +112,8 @@ USER nextjs
 EXPOSE 8080
 CMD ["node", "server.js"]
 """,
-            
-            'golang_gin': """# Multi-stage build for Go
+    
+    'golang_gin': """# Multi-stage build for Go
 FROM golang:1.21-alpine AS builder
 WORKDIR /app
 COPY go.mod go.sum ./
@@ -113,16 +129,47 @@ ENV PORT=8080
 EXPOSE 8080
 CMD ["./main"]
 """
-        }
+}
+
+# Compiled once at import. Shell variables ($PORT, $PATH) are escaped so
+# only ${entry_point} is substituted.
+DOCKERFILE_TEMPLATES = {
+    key: string.Template(source.replace('$', '$$').replace('{entry_point}', '${entry_point}'))
+    for key, source in _TEMPLATE_SOURCES.items()
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _render_template(framework_key: str, entry_point: str) -> str:
+    """Render a Dockerfile template; identical projects hit the cache"""
+    return DOCKERFILE_TEMPLATES[framework_key].substitute(entry_point=entry_point)
+
+
+class DockerExpertAgent:
+    """
+    Generates production-optimized Dockerfiles using Gemini
+    and pre-built templates for common frameworks.
+    """
+    
+    def __init__(self, gemini_api_key: str):
+        self.model = get_model(gemini_api_key)
+        
+        # Content-addressed cache of Gemini responses, keyed by prompt hash
+        self.cache = diskcache.Cache(
+            os.getenv('GEMINI_CACHE_DIR', '.gemini_cache'),
+            eviction_policy='least-recently-used'
+        )
+        
+        # (language, framework, entry_point, port, build_tool) -> result
+        self._custom_cache: OrderedDict = OrderedDict()
     
     async def generate_dockerfile(self, analysis: Dict) -> Dict:
         """Generate optimized Dockerfile based on analysis"""
         
         framework_key = f"{analysis['language']}_{analysis['framework']}"
         
-        if framework_key in self.templates:
-            template = self.templates[framework_key]
-            dockerfile = self._customize_template(template, analysis)
+        if framework_key in DOCKERFILE_TEMPLATES:
+            dockerfile = self._customize_template(framework_key, analysis)
             
             return {
                 'dockerfile': dockerfile,
@@ -139,14 +186,13 @@ CMD ["./main"]
         # Use Gemini for custom frameworks
         return await self._generate_custom_dockerfile(analysis)
     
-    def _customize_template(self, template: str, analysis: Dict) -> str:
+    def _customize_template(self, framework_key: str, analysis: Dict) -> str:
         """Customize template with project-specific values"""
         
-        entry_point = analysis.get('entry_point', 'app')
-        if entry_point:
-            entry_point = entry_point.replace('.py', '').replace('.js', '')
+        entry_point = analysis.get('entry_point') or 'app'
+        entry_point = entry_point.replace('.py', '').replace('.js', '')
         
-        return template.replace('{entry_point}', entry_point)
+        return _render_template(framework_key, entry_point)
     
     def _estimate_image_size(self, framework_key: str) -> str:
         """Estimate final image size"""
@@ -164,38 +210,44 @@ CMD ["./main"]
     async def _generate_custom_dockerfile(self, analysis: Dict) -> Dict:
         """Use Gemini to generate Dockerfile for unsupported frameworks"""
         
-        prompt = f"""
-Generate a production-optimized Dockerfile for Google Cloud Run with these requirements:
-
+        project_key = (
+            analysis['language'],
+            analysis['framework'],
+            analysis.get('entry_point'),
+            analysis.get('port'),
+            analysis.get('build_tool')
+        )
+        if project_key in self._custom_cache:
+            self._custom_cache.move_to_end(project_key)
+            return self._custom_cache[project_key]
+        
+        prompt = f"""{DOCKERFILE_INSTRUCTIONS}
 **Project Details:**
 - Language: {analysis['language']}
 - Framework: {analysis['framework']}
 - Entry Point: {analysis.get('entry_point', 'unknown')}
 - Port: {analysis.get('port', 8080)}
 - Build Tool: {analysis.get('build_tool', 'unknown')}
-
-**Requirements:**
-1. Multi-stage build to minimize image size
-2. Non-root user for security
-3. Use PORT environment variable (Cloud Run requirement)
-4. Layer caching optimization
-5. Production-ready configuration
-6. Include helpful comments
-
-Return ONLY the Dockerfile content, no markdown formatting.
 """
         
-        response = await self.model.generate_content_async(prompt)
+        cache_key = hashlib.sha256(prompt.encode()).hexdigest()
+        dockerfile_content = self.cache.get(cache_key)
         
-        # Properly extract text from Gemini response
-        dockerfile_content = None
-        if hasattr(response, 'text') and response.text:
-            dockerfile_content = response.text
-        elif hasattr(response, 'candidates') and response.candidates:
-            parts = response.candidates[0].content.parts
-            if parts:
-                dockerfile_content = ''.join([part.text for part in parts if hasattr(part, 'text')])
+        if dockerfile_content is None:
+            response = await self.model.generate_content_async(prompt)
+            
+            # Properly extract text from Gemini response
+            if hasattr(response, 'text') and response.text:
+                dockerfile_content = response.text
+            elif hasattr(response, 'candidates') and response.candidates:
+                parts = response.candidates[0].content.parts
+                if parts:
+                    dockerfile_content = ''.join([part.text for part in parts if hasattr(part, 'text')])
+            
+            if dockerfile_content:
+                self.cache.set(cache_key, dockerfile_content, expire=CACHE_TTL_SECONDS)
         
+        generated = bool(dockerfile_content)
         if not dockerfile_content:
             # Fallback to basic template
             dockerfile_content = f"""FROM python:3.11-slim
@@ -214,11 +266,19 @@ CMD ["python", "{analysis.get('entry_point', 'app.py')}"]
         elif '```' in dockerfile_content:
             dockerfile_content = dockerfile_content.split('```')[1].split('```')[0].strip()
         
-        return {
+        result = {
             'dockerfile': dockerfile_content,
             'optimizations': ["🤖 AI-generated for your specific stack"],
             'size_estimate': '~200MB'
         }
+        
+        # Only remember real Gemini output so a transient failure isn't pinned
+        if generated:
+            self._custom_cache[project_key] = result
+            if len(self._custom_cache) > MEMORY_CACHE_SIZE:
+                self._custom_cache.popitem(last=False)
+        
+        return result
 
 
 # Test docker expert
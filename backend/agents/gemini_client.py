@@ -0,0 +1,46 @@
+"""
+Gemini Client - Shared model instances for ServerGem agents
+"""
+
+import functools
+from typing import Optional
+import google.generativeai as genai
+
+
+GEMINI_MODEL = 'gemini-2.0-flash-exp'
+
+
+@functools.lru_cache(maxsize=1)
+def configure_genai(api_key: str) -> None:
+    """
+    Configure the SDK, skipping the call when the key is unchanged.
+
+    The SDK config is process-global, so only the most recent key is
+    remembered; switching keys always reconfigures.
+    """
+    genai.configure(api_key=api_key)
+
+
+def get_model(
+    api_key: str,
+    model_name: str = GEMINI_MODEL,
+    system_instruction: Optional[str] = None
+) -> genai.GenerativeModel:
+    """
+    Return the process-wide GenerativeModel for (model_name, system_instruction).
+
+    Agents share one instance (and its underlying HTTP client) instead of
+    building a new model per agent. A static system_instruction keeps fixed
+    instructions out of per-request prompts.
+
+    The SDK's API key is process-global, so the process uses a single
+    Gemini key: api_key is applied via configure_genai, and every model
+    runs under whichever key was configured last.
+    """
+    configure_genai(api_key)
+    return _build_model(model_name, system_instruction)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_model(model_name: str, system_instruction: Optional[str]) -> genai.GenerativeModel:
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
@@ -9,24 +9,35 @@ FAANG-Level Production Implementation
 """
 
 import asyncio
+import functools
+import itertools
+import logging
+import os
+import re
+import secrets
 import time
-from typing import Dict, List, Optional
+from contextvars import ContextVar
+from typing import Any, Dict, List, Mapping, Optional
 import google.generativeai as genai
 from datetime import datetime
-import json
-import uuid
+from types import SimpleNamespace
+import aiofiles
+import httpx
+from agents.chat_state import ContextView, SessionState, SessionStore
+from agents.gemini_client import configure_genai
+from services.deployment_progress import create_progress_tracker
 
-class OrchestratorAgent:
-    """
-    Production-grade orchestrator using Gemini ADK with function calling.
-    Routes to real services: GitHub, Google Cloud, Docker, Analysis.
-    """
-    
-    def __init__(self, gemini_api_key: str, github_token: str = None, gcloud_project: str = None):
-        genai.configure(api_key=gemini_api_key)
-        
-        # ServerGem-specific system instruction
-        system_instruction = """
+
+logger = logging.getLogger(__name__)
+
+# Deployment ids: a random per-process prefix plus an in-process counter,
+# unique within the process without a urandom call per deployment
+_DEPLOY_SEQ = itertools.count()
+_PROC_EPOCH = secrets.token_hex(3)
+
+
+# ServerGem-specific system instruction
+SYSTEM_INSTRUCTION = """
 You are ServerGem AI Assistant - a production-grade AI that deploys applications to Google Cloud Run using ServerGem's managed infrastructure.
 
 CRITICAL ARCHITECTURE PRINCIPLES:
@@ -54,113 +65,259 @@ DEPLOYMENT FLOW:
 5. You provide custom URL: https://{service-name}.servergem.app
 
 Be concise, helpful, and NEVER mention gcloud setup or GCP authentication.
-        """.strip()
+""".strip()
+
+# Session the current turn belongs to; set per turn task in _process_message
+# so handlers reach the right chat and project context
+_current_session: ContextVar[str] = ContextVar('servergem_session', default='default')
+
+# Messages (user and model) kept in the Gemini chat session; older turns
+# are dropped so per-turn prompt size stays bounded in long conversations
+MAX_HISTORY_MESSAGES = 24
+
+# Embeddings for the semantic reply cache; very short messages ("yes",
+# "ok") depend on conversation state and are never served from cache
+EMBEDDING_MODEL = 'models/text-embedding-004'
+SEMANTIC_CACHE_MIN_CHARS = 12
+
+# Concurrent Gemini generate calls per orchestrator; excess turns wait here
+# instead of bursting past the quota and retrying on 429s
+GEMINI_MAX_PARALLEL = int(os.getenv('GEMINI_MAX_PARALLEL', '8'))
+
+# Finish reasons of a streamed turn that completed normally; anything else
+# (SAFETY, RECITATION, MALFORMED_FUNCTION_CALL, ...) leaves the chat broken
+STREAM_OK_FINISH_REASONS = frozenset({
+    genai.protos.Candidate.FinishReason.FINISH_REASON_UNSPECIFIED,
+    genai.protos.Candidate.FinishReason.STOP,
+    genai.protos.Candidate.FinishReason.MAX_TOKENS
+})
+
+# Repeat "list my repos" requests within this window reuse the last listing
+REPO_LIST_TTL_SECONDS = 60
+
+# Functions available for Gemini to call (Google AI SDK format); built once
+# at import and shared by every orchestrator instance
+FUNCTION_DECLARATIONS = [
+    {
+        'name': 'clone_and_analyze_repo',
+        'description': 'Clone a GitHub repository and perform comprehensive analysis to detect framework, dependencies, and deployment requirements. Use this when user provides a GitHub repo URL.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'repo_url': {
+                    'type': 'string',
+                    'description': 'GitHub repository URL (https://github.com/user/repo or git@github.com:user/repo.git)'
+                },
+                'branch': {
+                    'type': 'string',
+                    'description': 'Branch name to clone and analyze (default: main)'
+                }
+            },
+            'required': ['repo_url']
+        }
+    },
+    {
+        'name': 'deploy_to_cloudrun',
+        'description': 'Deploy an analyzed project to Google Cloud Run. Generates Dockerfile, builds image via Cloud Build, and deploys the service. Use this after analyzing a repository.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'project_path': {
+                    'type': 'string',
+                    'description': 'Local path to the cloned project (from project_context)'
+                },
+                'service_name': {
+                    'type': 'string',
+                    'description': 'Name for the Cloud Run service (lowercase, hyphens allowed)'
+                },
+                'env_vars': {
+                    'type': 'object',
+                    'description': 'Environment variables as key-value pairs (optional)'
+                }
+            },
+            'required': ['project_path', 'service_name']
+        }
+    },
+    {
+        'name': 'list_user_repositories',
+        'description': 'List GitHub repositories for the authenticated user. Use this when user asks to see their repos or wants to select a project to deploy.',
+        'parameters': {
+            'type': 'object',
+            'properties': {},
+            'required': []
+        }
+    },
+    {
+        'name': 'get_deployment_logs',
+        'description': 'Fetch recent logs from a deployed Cloud Run service. Use this for debugging deployment issues or when user asks to see logs.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'service_name': {
+                    'type': 'string',
+                    'description': 'Cloud Run service name'
+                },
+                'limit': {
+                    'type': 'integer',
+                    'description': 'Number of log entries to fetch (default: 50)'
+                }
+            },
+            'required': ['service_name']
+        }
+    }
+]
+
+# Button actions and bare commands whose function call is fully determined
+# by project context; these skip the Gemini round-trip entirely
+DIRECT_COMMANDS = {
+    'deploy': 'deploy_to_cloudrun',
+    'view_logs': 'get_deployment_logs',
+    'logs': 'get_deployment_logs',
+    'list_repos': 'list_user_repositories',
+}
+DIRECT_COMMAND_PATTERN = re.compile(
+    r'^\s*(deploy|view[ _]logs|logs|list[ _]repos)\s*[.!]?\s*$',
+    re.IGNORECASE
+)
+
+# Declared parameter names per function, used to bind call arguments
+FUNCTION_PARAMETERS = {
+    declaration['name']: tuple(declaration['parameters']['properties'])
+    for declaration in FUNCTION_DECLARATIONS
+}
+
+
+# Chat summary shown after a successful clone-and-analyze
+ANALYSIS_RESPONSE_TEMPLATE = """
+🔍 **Analysis Complete: {repo_name}**
+
+**Framework:** {framework} ({language})
+**Entry Point:** `{entry_point}`
+**Dependencies:** {dependencies_count} packages
+**Port:** {port}
+{database_line}
+{env_vars_line}
+
+✅ **Dockerfile Generated** ({dockerfile_path})
+{optimizations}
+
+📋 **Recommendations:**
+{recommendations}
+
+{warnings}
+
+Ready to deploy to Google Cloud Run! Would you like me to proceed?
+""".strip()
+
+# Follow-up buttons sent with each analysis / deployment reply; shared
+# across responses, which are serialized but never modified
+ANALYSIS_ACTIONS = (
+    {'id': 'deploy', 'label': '🚀 Deploy to Cloud Run', 'type': 'button', 'action': 'deploy'},
+    {'id': 'view_dockerfile', 'label': '📄 View Dockerfile', 'type': 'button', 'action': 'view_dockerfile'},
+    {'id': 'configure_env', 'label': '⚙️ Configure Env Vars', 'type': 'button', 'action': 'configure_env'}
+)
+DEPLOY_ACTIONS = (
+    {'id': 'view_logs', 'label': '📊 View Logs', 'type': 'button', 'action': 'view_logs'},
+    {'id': 'setup_cicd', 'label': '🔄 Setup CI/CD', 'type': 'button', 'action': 'setup_cicd'},
+    {'id': 'custom_domain', 'label': '🌐 Add Custom Domain', 'type': 'button', 'action': 'custom_domain'}
+)
+
+
+def _bullets(items) -> str:
+    """Render items as a bulleted markdown list"""
+    return '\n'.join('• ' + item for item in items)
+
+
+class OrchestratorAgent:
+    """
+    Production-grade orchestrator using Gemini ADK with function calling.
+    Routes to real services: GitHub, Google Cloud, Docker, Analysis.
+    """
+    
+    def __init__(
+        self,
+        gemini_api_key: str,
+        github_token: str = None,
+        gcloud_project: str = None,
+        max_parallel_requests: int = GEMINI_MAX_PARALLEL
+    ):
+        configure_genai(gemini_api_key)
+        self._gemini_sem = asyncio.Semaphore(max_parallel_requests)
         
         # Initialize Gemini with function declarations and system instruction
         self.model = genai.GenerativeModel(
             'gemini-2.0-flash-exp',
-            tools=[self._get_function_declarations()],
-            system_instruction=system_instruction
+            tools=[FUNCTION_DECLARATIONS],
+            system_instruction=SYSTEM_INSTRUCTION
         )
         
-        self.conversation_history: List[Dict] = []
-        self.project_context: Dict = {}
-        self.chat_session = None
+        # Chat history and project context, kept per user session
+        self._sessions = SessionStore()
+        self._inflight: Dict[tuple, asyncio.Task] = {}  # (session, message) -> running turn
         
-        # Initialize real services
-        from services import GitHubService, GCloudService, DockerService, AnalysisService
-from services.monitoring import monitoring
-        from services.security import security
-        from services.optimization import optimization
-        from services.deployment_progress import create_progress_tracker
+        # Gemini function name -> bound handler, built once per orchestrator
+        self._fn_handlers = {
+            'clone_and_analyze_repo': self._handle_clone_and_analyze,
+            'deploy_to_cloudrun': self._handle_deploy_to_cloudrun,
+            'list_user_repositories': self._handle_list_repos,
+            'get_deployment_logs': self._handle_get_logs
+        }
         
-        self.github_service = GitHubService(github_token)
-        # Use ServerGem's GCP project (not user's)
-        self.gcloud_service = GCloudService(gcloud_project or 'servergem-platform') if gcloud_project else None
-        self.docker_service = DockerService()
-        self.analysis_service = AnalysisService(gemini_api_key)
+        self._repo_cache: Dict[str, tuple] = {}  # GitHub token -> (fetched_at, repos)
         
-        # Production services
-        self.monitoring = monitoring
-        self.security = security
-        self.optimization = optimization
+        # One pooled HTTP/2 client shared by the HTTP-backed services
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+        
+        # Real services are imported and built on first use (see properties
+        # below), so sessions that never deploy don't load the deploy stack
+        self._gemini_api_key = gemini_api_key
+        self._github_token = github_token
+        self._gcloud_project = gcloud_project
     
-    def _get_function_declarations(self) -> List[Dict]:
-        """
-        Define real functions available for Gemini ADK to call
-        Uses proper Google AI SDK format
-        """
-        return [
-            {
-                'name': 'clone_and_analyze_repo',
-                'description': 'Clone a GitHub repository and perform comprehensive analysis to detect framework, dependencies, and deployment requirements. Use this when user provides a GitHub repo URL.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'repo_url': {
-                            'type': 'string',
-                            'description': 'GitHub repository URL (https://github.com/user/repo or git@github.com:user/repo.git)'
-                        },
-                        'branch': {
-                            'type': 'string',
-                            'description': 'Branch name to clone and analyze (default: main)'
-                        }
-                    },
-                    'required': ['repo_url']
-                }
-            },
-            {
-                'name': 'deploy_to_cloudrun',
-                'description': 'Deploy an analyzed project to Google Cloud Run. Generates Dockerfile, builds image via Cloud Build, and deploys the service. Use this after analyzing a repository.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'project_path': {
-                            'type': 'string',
-                            'description': 'Local path to the cloned project (from project_context)'
-                        },
-                        'service_name': {
-                            'type': 'string',
-                            'description': 'Name for the Cloud Run service (lowercase, hyphens allowed)'
-                        },
-                        'env_vars': {
-                            'type': 'object',
-                            'description': 'Environment variables as key-value pairs (optional)'
-                        }
-                    },
-                    'required': ['project_path', 'service_name']
-                }
-            },
-            {
-                'name': 'list_user_repositories',
-                'description': 'List GitHub repositories for the authenticated user. Use this when user asks to see their repos or wants to select a project to deploy.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {},
-                    'required': []
-                }
-            },
-            {
-                'name': 'get_deployment_logs',
-                'description': 'Fetch recent logs from a deployed Cloud Run service. Use this for debugging deployment issues or when user asks to see logs.',
-                'parameters': {
-                    'type': 'object',
-                    'properties': {
-                        'service_name': {
-                            'type': 'string',
-                            'description': 'Cloud Run service name'
-                        },
-                        'limit': {
-                            'type': 'integer',
-                            'description': 'Number of log entries to fetch (default: 50)'
-                        }
-                    },
-                    'required': ['service_name']
-                }
-            }
-        ]
+    @functools.cached_property
+    def github_service(self):
+        from services.github_service import GitHubService
+        return GitHubService(self._github_token, http_client=self._http)
+    
+    @functools.cached_property
+    def gcloud_service(self):
+        # Use ServerGem's GCP project (not user's)
+        if not self._gcloud_project:
+            return None
+        from services.gcloud_service import GCloudService
+        return GCloudService(self._gcloud_project)
+    
+    @functools.cached_property
+    def docker_service(self):
+        from services.docker_service import DockerService
+        return DockerService()
+    
+    @functools.cached_property
+    def analysis_service(self):
+        from services.analysis_service import AnalysisService
+        return AnalysisService(self._gemini_api_key)
     
-    async def process_message(self, user_message: str, session_id: str, progress_callback=None) -> Dict:
+    # Production services
+    @functools.cached_property
+    def monitoring(self):
+        from services.monitoring import monitoring
+        return monitoring
+    
+    @functools.cached_property
+    def security(self):
+        from services.security import security
+        return security
+    
+    @functools.cached_property
+    def optimization(self):
+        from services.optimization import optimization
+        return optimization
+    
+    async def process_message(self, user_message: str, session_id: str, progress_callback=None, stream: bool = False) -> Dict:
         """
         Main entry point: processes user message with Gemini ADK function calling
         
@@ -168,89 +325,219 @@ from services.monitoring import monitoring
             user_message: User's chat message
             session_id: Session identifier
             progress_callback: Optional async callback for real-time updates
+            stream: Forward reply text via progress_callback as it is generated
+        """
+        
+        # An identical message arriving while one is still being processed
+        # (double-clicked button, resend after reconnect) joins that turn
+        # instead of issuing a second Gemini call or function call
+        key = (session_id, user_message.strip())
+        task = self._inflight.get(key)
+        if task and not task.done():
+            logger.debug("[Orchestrator] Joining in-flight request for identical message")
+        else:
+            task = asyncio.ensure_future(
+                self._process_message(user_message, session_id, progress_callback, stream)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(
+                lambda done: self._inflight.pop(key) if self._inflight.get(key) is done else None
+            )
+        
+        # Shielded so one disconnecting caller doesn't cancel the others' turn
+        response = dict(await asyncio.shield(task))
+        
+        # Every response is stamped once here rather than on each return path
+        response['timestamp'] = datetime.now()
+        return response
+    
+    async def process_message_stream(self, user_message: str, session_id: str, progress_callback) -> Dict:
         """
+        Streaming variant of process_message.
+        
+        Reply text is pushed to progress_callback as {'type': 'message_delta',
+        'content': ...} while Gemini generates it; the complete response
+        (or the function call's result) is still returned at the end.
+        """
+        return await self.process_message(user_message, session_id, progress_callback, stream=True)
+    
+    async def _process_message(self, user_message: str, session_id: str, progress_callback=None, stream: bool = False) -> Dict:
+        """Route a message to Gemini (and any requested function) and build the response"""
+        
+        # Runs in its own task, so this only scopes the handlers below
+        _current_session.set(session_id)
+        session = self._session
         
         # Initialize chat session if needed
-        if not self.chat_session:
-            self.chat_session = self.model.start_chat(history=[])
+        if not session.chat:
+            session.chat = self.model.start_chat(history=[])
+            session.sent_context = ''
+        
+        direct_call = self._match_direct_command(user_message)
+        if direct_call:
+            logger.debug("[Orchestrator] Direct command, skipping Gemini request: %s", direct_call.name)
+            return await self._handle_function_call(direct_call, progress_callback=progress_callback)
         
-        # Add project context to enhance Gemini's understanding
-        context_prefix = self._build_context_prefix()
-        enhanced_message = f"{context_prefix}\n\nUser: {user_message}" if context_prefix else user_message
+        # Add project context only when it changed since the last turn; the
+        # chat history already carries earlier context, so unchanged context
+        # is not re-sent (and re-processed) on every message
+        context_prefix = session.context_prefix
+        if context_prefix and context_prefix != session.sent_context:
+            enhanced_message = f"{context_prefix}\n\nUser: {user_message}"
+        else:
+            enhanced_message = user_message
         
         try:
-            # Send to Gemini with function calling enabled
-            response = await asyncio.to_thread(
-                self.chat_session.send_message,
-                enhanced_message
-            )
+            # Serve near-duplicate questions under the same context from cache
+            embedding = None
+            if len(user_message) >= SEMANTIC_CACHE_MIN_CHARS:
+                embedding = await self._embed_message(user_message)
+            if embedding is not None:
+                cached = session.response_cache.lookup(embedding, context_prefix)
+                if cached:
+                    logger.debug("[Orchestrator] Semantic cache hit, skipping Gemini request")
+                    self._record_cached_turn(session, enhanced_message, cached['content'])
+                    session.sent_context = context_prefix
+                    self._trim_chat_history(session)
+                    return dict(cached)
             
-            # Check if Gemini wants to call a function
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                    for part in candidate.content.parts:
-                        if hasattr(part, 'function_call') and part.function_call:
-                            # Route to real service handler
-                            return await self._handle_function_call(
-                                part.function_call,
-                                progress_callback=progress_callback
-                            )
+            # Send to Gemini with function calling enabled
+            # Native async call: no worker thread is held while Gemini responds
+            async with self._gemini_sem:
+                if stream and progress_callback:
+                    # The SDK keeps a streamed response in the chat before it is
+                    # checked, and a broken one makes every later history access
+                    # raise; keep the history to restart the chat from on failure
+                    prior_history = list(session.chat.history)
+                    try:
+                        # Function calls arrive whole in a chunk; text is forwarded as
+                        # it comes, and the response aggregates all chunks at the end
+                        response = await session.chat.send_message_async(enhanced_message, stream=True)
+                        async for chunk in response:
+                            delta = self._chunk_text(chunk)
+                            if delta:
+                                await progress_callback({'type': 'message_delta', 'content': delta})
+                        
+                        candidate = response.candidates[0] if response.candidates else None
+                        if candidate is None or candidate.finish_reason not in STREAM_OK_FINISH_REASONS:
+                            reason = candidate.finish_reason.name if candidate else 'no candidates'
+                            raise RuntimeError(f"Gemini response stopped early ({reason})")
+                    except BaseException:
+                        session.chat = self.model.start_chat(history=prior_history)
+                        session.sent_context = ''
+                        raise
+                else:
+                    response = await session.chat.send_message_async(enhanced_message)
+            session.sent_context = context_prefix
+            self._record_usage(session, response)
+            self._trim_chat_history(session)
+            
+            # Route any function calls Gemini requested; several calls in one
+            # turn run concurrently. Their result is the reply, so Gemini is
+            # not asked to summarize it in another turn
+            parts = response.candidates[0].content.parts if response.candidates else []
+            function_calls = [part.function_call for part in parts if part.function_call]
+            if function_calls:
+                results = await asyncio.gather(*(
+                    self._handle_function_call(function_call, progress_callback=progress_callback)
+                    for function_call in function_calls
+                ))
+                self._record_function_turn(session, [call.name for call in function_calls], results)
+                return results[0] if len(results) == 1 else self._merge_function_results(results)
             
             # Regular text response (no function call needed)
-            response_text = ''
-            if hasattr(response, 'text') and response.text:
-                response_text = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                parts = response.candidates[0].content.parts
-                if parts:
-                    response_text = ''.join([part.text for part in parts if hasattr(part, 'text')])
+            response_text = ''.join(part.text for part in parts if part.text)
             
-            return {
+            result = {
                 'type': 'message',
-                'content': response_text if response_text else 'I received your message but couldn\'t generate a response. Please try again.',
-                'timestamp': datetime.now().isoformat()
+                'content': response_text if response_text else 'I received your message but couldn\'t generate a response. Please try again.'
             }
             
+            # Function calls have side effects and are never cached
+            if response_text and embedding is not None:
+                session.response_cache.store(embedding, context_prefix, result)
+            
+            return result
+            
         except Exception as e:
-            print(f"[Orchestrator] Error: {str(e)}")
+            logger.exception("[Orchestrator] Error: %s", e)
             return {
                 'type': 'error',
-                'content': f'❌ Error processing message: {str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ Error processing message: {str(e)}'
             }
     
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Text parts of a streamed chunk (chunk.text raises on function calls)"""
+        if not chunk.candidates:
+            return ''
+        return ''.join(part.text for part in chunk.candidates[0].content.parts if part.text)
+    
+    def _match_direct_command(self, user_message: str) -> Optional[SimpleNamespace]:
+        """
+        Build the function call for a known command, if its arguments are
+        available from project context; otherwise the message goes to Gemini
+        """
+        match = DIRECT_COMMAND_PATTERN.match(user_message)
+        if not match:
+            return None
+        
+        function_name = DIRECT_COMMANDS[match.group(1).lower().replace(' ', '_')]
+        context = self._session.context
+        
+        if function_name == 'deploy_to_cloudrun':
+            # Only a redeploy under a service name the user already confirmed,
+            # of a project that needs no env vars, skips Gemini; otherwise
+            # Gemini asks for the name and env vars first
+            if (
+                context.project_path is None
+                or context.service_name is None
+                or context.analysis is None
+                or context.analysis.get('env_vars')
+            ):
+                return None
+            args = {'project_path': context.project_path, 'service_name': context.service_name}
+        elif function_name == 'get_deployment_logs':
+            if context.deployed_service is None:
+                return None
+            args = {'service_name': context.deployed_service}
+        else:
+            args = {}
+        
+        return SimpleNamespace(name=function_name, args=args)
+    
     async def _handle_function_call(self, function_call, progress_callback=None) -> Dict:
         """
         Route Gemini function calls to real service implementations
         
+        The handler's structured result is returned as-is and is not sent
+        back to Gemini for a follow-up turn; its 'content' is already the
+        user-facing summary.
+        
         Args:
             function_call: Gemini function call object
             progress_callback: Optional async callback for WebSocket updates
         """
         
         function_name = function_call.name
-        args = dict(function_call.args)
+        call_args = function_call.args
+        args = {
+            name: call_args[name]
+            for name in FUNCTION_PARAMETERS.get(function_name, ())
+            if name in call_args
+        }
         
-        print(f"[Orchestrator] Function call: {function_name} with args: {args}")
+        logger.debug("[Orchestrator] Function call: %s args=%s", function_name, args)
         
         # Route to real service handlers
-        handlers = {
-            'clone_and_analyze_repo': self._handle_clone_and_analyze,
-            'deploy_to_cloudrun': self._handle_deploy_to_cloudrun,
-            'list_user_repositories': self._handle_list_repos,
-            'get_deployment_logs': self._handle_get_logs
-        }
-        
-        handler = handlers.get(function_name)
+        handler = self._fn_handlers.get(function_name)
         
         if handler:
             return await handler(progress_callback=progress_callback, **args)
         else:
             return {
                 'type': 'error',
-                'content': f'❌ Unknown function: {function_name}',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ Unknown function: {function_name}'
             }
     
     # ========================================================================
@@ -263,30 +550,29 @@ from services.monitoring import monitoring
         Uses: GitHubService, AnalysisService, DockerService
         """
         
+        # Create progress tracker for structured updates (also used to report
+        # failures below)
+        tracker = create_progress_tracker(
+            deployment_id=f"analysis-{time.time()}",
+            service_name=repo_url.split('/')[-1].replace('.git', ''),
+            progress_callback=progress_callback
+        )
+        
         try:
-            # Create progress tracker for structured updates
-            tracker = create_progress_tracker(
-                deployment_id=f"analysis-{datetime.now().timestamp()}",
-                service_name=repo_url.split('/')[-1].replace('.git', ''),
-                progress_callback=progress_callback
-            )
-            
             # Step 1: Clone repository using GitHubService
             await tracker.start_repo_clone(repo_url)
             
-            clone_result = self.github_service.clone_repository(repo_url, branch)
+            # git clone blocks; keep it off the event loop
+            clone_result = await asyncio.to_thread(self.github_service.clone_repository, repo_url, branch)
             
             if not clone_result.get('success'):
                 return {
                     'type': 'error',
-                    'content': f"❌ **Failed to clone repository**\n\n{clone_result.get('error')}\n\nPlease check:\n• Repository URL is correct\n• You have access to the repository\n• GitHub token has proper permissions",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Failed to clone repository**\n\n{clone_result.get('error')}\n\nPlease check:\n• Repository URL is correct\n• You have access to the repository\n• GitHub token has proper permissions"
                 }
             
             project_path = clone_result['local_path']
-            self.project_context['project_path'] = project_path
-            self.project_context['repo_url'] = repo_url
-            self.project_context['branch'] = branch
+            self._session.set_context(project_path=project_path, repo_url=repo_url, branch=branch, service_name=None)
             
             # Emit clone completion with details
             await tracker.complete_repo_clone(
@@ -298,28 +584,41 @@ from services.monitoring import monitoring
             # Step 2: Analyze project using AnalysisService
             await tracker.start_code_analysis(project_path)
             
-            analysis_result = await self.analysis_service.analyze_and_generate(project_path)
+            # Report the framework as soon as Gemini streams it back
+            framework_reported = False
+            
+            async def report_framework(partial: Dict):
+                nonlocal framework_reported
+                framework_reported = True
+                await tracker.emit_framework_detection(partial['framework'], partial['language'], 'latest')
+            
+            analysis_result = await self.analysis_service.analyze_and_generate(
+                project_path,
+                on_partial=report_framework
+            )
             
             if not analysis_result.get('success'):
                 await tracker.emit_error('code_analysis', analysis_result.get('error', 'Unknown error'))
                 return {
                     'type': 'error',
-                    'content': f"❌ **Analysis failed**\n\n{analysis_result.get('error')}",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Analysis failed**\n\n{analysis_result.get('error')}"
                 }
             
-            # Emit framework and dependency detection
+            # Emit framework (unless already streamed) and dependency detection
+            # as one frame
             analysis_data = analysis_result['analysis']
-            await tracker.emit_framework_detection(
-                analysis_data['framework'],
-                analysis_data['language'],
-                analysis_data.get('runtime', 'latest')
-            )
-            await tracker.emit_dependency_analysis(
-                analysis_data['dependencies_count'],
-                analysis_data.get('database')
-            )
-            await tracker.complete_code_analysis()
+            async with tracker.batch():
+                if not framework_reported:
+                    await tracker.emit_framework_detection(
+                        analysis_data['framework'],
+                        analysis_data['language'],
+                        analysis_data.get('runtime', 'latest')
+                    )
+                await tracker.emit_dependency_analysis(
+                    analysis_data['dependencies_count'],
+                    analysis_data.get('database')
+                )
+                await tracker.complete_code_analysis()
             
             # Step 3: Generate and save Dockerfile
             await tracker.start_dockerfile_generation(analysis_data['framework'])
@@ -328,100 +627,70 @@ from services.monitoring import monitoring
                 analysis_result['dockerfile']['optimizations']
             )
             
-            dockerfile_save = self.docker_service.save_dockerfile(
-                analysis_result['dockerfile']['content'],
-                project_path
+            # Step 4: Create .dockerignore alongside it (independent writes)
+            dockerfile_save, _ = await asyncio.gather(
+                asyncio.to_thread(
+                    self.docker_service.save_dockerfile,
+                    analysis_result['dockerfile']['content'],
+                    project_path
+                ),
+                asyncio.to_thread(
+                    self.docker_service.create_dockerignore,
+                    project_path,
+                    analysis_data['language']
+                )
             )
             
             await tracker.complete_dockerfile_generation(
                 dockerfile_save.get('path', f'{project_path}/Dockerfile')
             )
             
-            # Step 4: Create .dockerignore
-            self.docker_service.create_dockerignore(
-                project_path,
-                analysis_result['analysis']['language']
-            )
-            
             # Store analysis in context for future operations
-            self.project_context['analysis'] = analysis_result['analysis']
-            self.project_context['framework'] = analysis_result['analysis']['framework']
-            self.project_context['language'] = analysis_result['analysis']['language']
+            self._session.set_context(
+                analysis=analysis_data,
+                framework=analysis_data['framework'],
+                language=analysis_data['language']
+            )
             
             # Format beautiful response
-            analysis_data = analysis_result['analysis']
-            content = f"""
-🔍 **Analysis Complete: {repo_url.split('/')[-1]}**
-
-**Framework:** {analysis_data['framework']} ({analysis_data['language']})
-**Entry Point:** `{analysis_data['entry_point']}`
-**Dependencies:** {analysis_data['dependencies_count']} packages
-**Port:** {analysis_data['port']}
-{f"**Database:** {analysis_data['database']}" if analysis_data.get('database') else ''}
-{f"**Environment Variables:** {len(analysis_data['env_vars'])} detected" if analysis_data.get('env_vars') else ''}
-
-✅ **Dockerfile Generated** ({dockerfile_save.get('path', 'Dockerfile')})
-{chr(10).join(['• ' + opt for opt in analysis_result['dockerfile']['optimizations'][:4]])}
-
-📋 **Recommendations:**
-{chr(10).join(['• ' + rec for rec in analysis_result['recommendations'][:3]])}
-
-{f"⚠️ **Warnings:**{chr(10)}{chr(10).join(['• ' + w for w in analysis_result['warnings']][:2])}" if analysis_result.get('warnings') else ''}
-
-Ready to deploy to Google Cloud Run! Would you like me to proceed?
-            """.strip()
+            warnings = analysis_result.get('warnings')
+            content = ANALYSIS_RESPONSE_TEMPLATE.format(
+                repo_name=repo_url.split('/')[-1],
+                framework=analysis_data['framework'],
+                language=analysis_data['language'],
+                entry_point=analysis_data['entry_point'],
+                dependencies_count=analysis_data['dependencies_count'],
+                port=analysis_data['port'],
+                database_line=f"**Database:** {analysis_data['database']}" if analysis_data.get('database') else '',
+                env_vars_line=f"**Environment Variables:** {len(analysis_data['env_vars'])} detected" if analysis_data.get('env_vars') else '',
+                dockerfile_path=dockerfile_save.get('path', 'Dockerfile'),
+                optimizations=_bullets(analysis_result['dockerfile']['optimizations'][:4]),
+                recommendations=_bullets(analysis_result['recommendations'][:3]),
+                warnings=f"⚠️ **Warnings:**\n{_bullets(warnings[:2])}" if warnings else ''
+            )
             
             return {
                 'type': 'analysis',
                 'content': content,
                 'data': analysis_result,
-                'actions': [
-                    {
-                        'id': 'deploy',
-                        'label': '🚀 Deploy to Cloud Run',
-                        'type': 'button',
-                        'action': 'deploy'
-                    },
-                    {
-                        'id': 'view_dockerfile',
-                        'label': '📄 View Dockerfile',
-                        'type': 'button',
-                        'action': 'view_dockerfile'
-                    },
-                    {
-                        'id': 'configure_env',
-                        'label': '⚙️ Configure Env Vars',
-                        'type': 'button',
-                        'action': 'configure_env'
-                    }
-                ],
-                'timestamp': datetime.now().isoformat()
+                'actions': ANALYSIS_ACTIONS
             }
             
         except Exception as e:
             error_msg = str(e)
-            print(f"[Orchestrator] Clone and analyze error: {error_msg}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[Orchestrator] Clone and analyze error: %s", error_msg)
             
             # Send error via progress callback if available
             if progress_callback:
                 try:
-                    from services.deployment_progress import create_progress_tracker
-                    tracker = create_progress_tracker(
-                        deployment_id=f"error-{datetime.now().timestamp()}",
-                        service_name="analysis",
-                        progress_callback=progress_callback
-                    )
                     await tracker.emit_error("Repository Analysis", error_msg)
                 except Exception as callback_error:
-                    print(f"[Orchestrator] Could not send error via callback: {callback_error}")
+                    logger.warning("[Orchestrator] Could not send error via callback: %s", callback_error)
                     pass
             
             return {
                 'type': 'error',
-                'content': f'❌ **Analysis failed**\n\n```\n{error_msg}\n```\n\nPlease try again or check the logs.',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ **Analysis failed**\n\n```\n{error_msg}\n```\n\nPlease try again or check the logs.'
             }
     
     async def _handle_deploy_to_cloudrun(
@@ -445,12 +714,11 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
         if not self.gcloud_service:
             return {
                 'type': 'error',
-                'content': '❌ **ServerGem Cloud not configured**\n\nPlease contact support. This is a platform configuration issue.',
-                'timestamp': datetime.now().isoformat()
+                'content': '❌ **ServerGem Cloud not configured**\n\nPlease contact support. This is a platform configuration issue.'
             }
         
         # Generate deployment ID for tracking
-        deployment_id = f"deploy-{uuid.uuid4().hex[:8]}"
+        deployment_id = f"deploy-{_PROC_EPOCH}{next(_DEPLOY_SEQ):x}"
         start_time = time.time()
         
         try:
@@ -470,8 +738,7 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
                 self.monitoring.complete_deployment(deployment_id, "failed")
                 return {
                     'type': 'error',
-                    'content': f"❌ **Invalid service name**\n\n{name_validation['error']}\n\nRequirements:\n• Lowercase letters, numbers, hyphens only\n• Must start with letter\n• Max 63 characters",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Invalid service name**\n\n{name_validation['error']}\n\nRequirements:\n• Lowercase letters, numbers, hyphens only\n• Must start with letter\n• Max 63 characters"
                 }
             
             service_name = name_validation['sanitized_name']
@@ -487,35 +754,35 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
                 env_vars = env_validation['sanitized']
             
             # Optimization: Get optimal resource config
-            framework = self.project_context.get('framework', 'unknown')
+            framework = self._session.context.framework or 'unknown'
             optimal_config = self.optimization.get_optimal_config(framework, 'medium')
             
             self.monitoring.record_stage(deployment_id, 'validation', 'success', 0.5)
             
             # SERVERGEM ARCHITECTURE: No user GCP auth needed - using ServerGem's infrastructure
-            # Step 1: Validate Dockerfile exists
-            dockerfile_check = self.docker_service.validate_dockerfile(project_path)
-            if not dockerfile_check.get('valid'):
+            # Step 1: Validate the Dockerfile and run the security scan
+            # concurrently; both read from disk, so they run off the event loop
+            dockerfile_check, security_scan = await asyncio.gather(
+                asyncio.to_thread(self.docker_service.validate_dockerfile, project_path),
+                self._read_and_scan_dockerfile(project_path)
+            )
+            if not dockerfile_check.get('valid') or security_scan is None:
                 self.monitoring.complete_deployment(deployment_id, 'failed')
                 return {
                     'type': 'error',
-                    'content': f"❌ **Invalid Dockerfile**\n\n{dockerfile_check.get('error')}",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Invalid Dockerfile**\n\n{dockerfile_check.get('error')}"
                 }
             
             # Security: Scan Dockerfile
             await tracker.start_security_scan()
             
-            security_scan = self.security.scan_dockerfile_security(
-                open(f"{project_path}/Dockerfile").read()
-            )
-            
-            # Emit security check results
-            await tracker.emit_security_check("Base image validation", security_scan['secure'])
-            await tracker.emit_security_check("Privilege escalation check", not any('privilege' in issue.lower() for issue in security_scan['issues']))
-            await tracker.emit_security_check("Secret exposure check", not any('secret' in issue.lower() for issue in security_scan['issues']))
-            
-            await tracker.complete_security_scan(len(security_scan['issues']))
+            # Emit security check results as one frame
+            async with tracker.batch():
+                await tracker.emit_security_check("Base image validation", security_scan['secure'])
+                await tracker.emit_security_check("Privilege escalation check", not any('privilege' in issue.lower() for issue in security_scan['issues']))
+                await tracker.emit_security_check("Secret exposure check", not any('secret' in issue.lower() for issue in security_scan['issues']))
+                
+                await tracker.complete_security_scan(len(security_scan['issues']))
             
             if not security_scan['secure']:
                 for issue in security_scan['issues'][:3]:
@@ -553,8 +820,7 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
                 self.monitoring.complete_deployment(deployment_id, 'failed')
                 return {
                     'type': 'error',
-                    'content': f"❌ **Build failed**\n\n{build_result.get('error')}\n\nCheck:\n• Dockerfile syntax\n• Cloud Build API is enabled\n• Billing is enabled",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Build failed**\n\n{build_result.get('error')}\n\nCheck:\n• Dockerfile syntax\n• Cloud Build API is enabled\n• Billing is enabled"
                 }
             
             # Emit build completion
@@ -598,8 +864,7 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
                 self.monitoring.complete_deployment(deployment_id, 'failed')
                 return {
                     'type': 'error',
-                    'content': f"❌ **Deployment failed**\n\n{deploy_result.get('error')}\n\nCheck:\n• Cloud Run API is enabled\n• Service account permissions",
-                    'timestamp': datetime.now().isoformat()
+                    'content': f"❌ **Deployment failed**\n\n{deploy_result.get('error')}\n\nCheck:\n• Cloud Run API is enabled\n• Service account permissions"
                 }
             
             # Success! Complete deployment
@@ -610,9 +875,12 @@ Ready to deploy to Google Cloud Run! Would you like me to proceed?
             self.monitoring.complete_deployment(deployment_id, 'success')
             
             # Store deployment info
-            self.project_context['deployed_service'] = service_name
-            self.project_context['deployment_url'] = deploy_result['url']
-            self.project_context['deployment_id'] = deployment_id
+            self._session.set_context(
+                service_name=service_name,
+                deployed_service=service_name,
+                deployment_url=deploy_result['url'],
+                deployment_id=deployment_id
+            )
             
             # Get cost estimation
             estimated_cost = self.optimization.estimate_cost(optimal_config, 100000)  # 100k requests/month
@@ -670,66 +938,55 @@ What would you like to do next?
                     'security_scan': security_scan
                 },
                 'deployment_url': deploy_result['url'],
-                'actions': [
-                    {
-                        'id': 'view_logs',
-                        'label': '📊 View Logs',
-                        'type': 'button',
-                        'action': 'view_logs'
-                    },
-                    {
-                        'id': 'setup_cicd',
-                        'label': '🔄 Setup CI/CD',
-                        'type': 'button',
-                        'action': 'setup_cicd'
-                    },
-                    {
-                        'id': 'custom_domain',
-                        'label': '🌐 Add Custom Domain',
-                        'type': 'button',
-                        'action': 'custom_domain'
-                    }
-                ],
-                'timestamp': datetime.now().isoformat()
+                'actions': DEPLOY_ACTIONS
             }
             
         except Exception as e:
             self.monitoring.complete_deployment(deployment_id, 'failed')
-            print(f"[Orchestrator] Deployment error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[Orchestrator] Deployment error: %s", e)
             return {
                 'type': 'error',
-                'content': f'❌ **Deployment failed**\n\n```\n{str(e)}\n```',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ **Deployment failed**\n\n```\n{str(e)}\n```'
             }
     
     async def _handle_list_repos(self, progress_callback=None) -> Dict:
         """List user's GitHub repositories - REAL IMPLEMENTATION"""
         
         try:
-            # Validate GitHub token first
-            token_check = self.github_service.validate_token()
-            if not token_check.get('valid'):
-                return {
-                    'type': 'error',
-                    'content': f"❌ **GitHub token invalid**\n\n{token_check.get('error')}\n\nPlease set `GITHUB_TOKEN` environment variable.\n\nGet token at: https://github.com/settings/tokens",
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            if progress_callback:
-                await progress_callback({
-                    'type': 'typing',
-                    'message': 'Fetching your GitHub repositories...'
-                })
-            
-            repos = self.github_service.list_repositories()
+            # A recent listing for the same token skips both GitHub calls
+            cache_key = self.github_service.token or ''
+            cached = self._repo_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < REPO_LIST_TTL_SECONDS:
+                repos = cached[1]
+            else:
+                if progress_callback:
+                    await progress_callback({
+                        'type': 'typing',
+                        'message': 'Fetching your GitHub repositories...'
+                    })
+                
+                # Validate the token and fetch the listing concurrently; a
+                # failed validation still takes precedence over the listing
+                token_check, repos = await asyncio.gather(
+                    self.github_service.validate_token(),
+                    self.github_service.list_repositories(),
+                    return_exceptions=True
+                )
+                if isinstance(token_check, BaseException) or not token_check.get('valid'):
+                    error = token_check if isinstance(token_check, BaseException) else token_check.get('error')
+                    return {
+                        'type': 'error',
+                        'content': f"❌ **GitHub token invalid**\n\n{error}\n\nPlease set `GITHUB_TOKEN` environment variable.\n\nGet token at: https://github.com/settings/tokens"
+                    }
+                if isinstance(repos, BaseException):
+                    raise repos
+                
+                self._repo_cache[cache_key] = (time.monotonic(), repos)
             
             if not repos:
                 return {
                     'type': 'message',
-                    'content': '📚 **No repositories found**\n\nCreate a repository on GitHub first, then try again.',
-                    'timestamp': datetime.now().isoformat()
+                    'content': '📚 **No repositories found**\n\nCreate a repository on GitHub first, then try again.'
                 }
             
             # Format repo list beautifully
@@ -751,16 +1008,14 @@ Which repository would you like to deploy? Just tell me the name or paste the UR
             return {
                 'type': 'message',
                 'content': content,
-                'data': {'repositories': repos},
-                'timestamp': datetime.now().isoformat()
+                'data': {'repositories': repos}
             }
             
         except Exception as e:
-            print(f"[Orchestrator] List repos error: {str(e)}")
+            logger.exception("[Orchestrator] List repos error: %s", e)
             return {
                 'type': 'error',
-                'content': f'❌ **Failed to list repositories**\n\n{str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ **Failed to list repositories**\n\n{str(e)}'
             }
     
     async def _handle_get_logs(self, service_name: str, limit: int = 50, progress_callback=None) -> Dict:
@@ -769,8 +1024,7 @@ Which repository would you like to deploy? Just tell me the name or paste the UR
         if not self.gcloud_service:
             return {
                 'type': 'error',
-                'content': '❌ **Google Cloud not configured**\n\nPlease set `GOOGLE_CLOUD_PROJECT` environment variable.',
-                'timestamp': datetime.now().isoformat()
+                'content': '❌ **Google Cloud not configured**\n\nPlease set `GOOGLE_CLOUD_PROJECT` environment variable.'
             }
         
         try:
@@ -780,13 +1034,12 @@ Which repository would you like to deploy? Just tell me the name or paste the UR
                     'message': f'Fetching logs for {service_name}...'
                 })
             
-            logs = self.gcloud_service.get_service_logs(service_name, limit=limit)
+            logs = await self.gcloud_service.get_service_logs(service_name, limit=limit)
             
             if not logs or len(logs) == 0:
                 return {
                     'type': 'message',
-                    'content': f'📊 **No logs found for {service_name}**\n\nService may not have received traffic yet.',
-                    'timestamp': datetime.now().isoformat()
+                    'content': f'📊 **No logs found for {service_name}**\n\nService may not have received traffic yet.'
                 }
             
             # Format logs
@@ -805,72 +1058,185 @@ Showing last {min(20, len(logs))} entries (total: {len(logs)})
             return {
                 'type': 'message',
                 'content': content,
-                'data': {'logs': logs},
-                'timestamp': datetime.now().isoformat()
+                'data': {'logs': logs}
             }
             
         except Exception as e:
-            print(f"[Orchestrator] Get logs error: {str(e)}")
+            logger.exception("[Orchestrator] Get logs error: %s", e)
             return {
                 'type': 'error',
-                'content': f'❌ **Failed to fetch logs**\n\n{str(e)}',
-                'timestamp': datetime.now().isoformat()
+                'content': f'❌ **Failed to fetch logs**\n\n{str(e)}'
             }
     
     # ========================================================================
     # CONTEXT MANAGEMENT
     # ========================================================================
     
-    def _build_context_prefix(self) -> str:
-        """Build context string from stored project data"""
-        if not self.project_context:
-            return ""
+    async def _read_and_scan_dockerfile(self, project_path: str) -> Optional[Dict]:
+        """Security-scan the project's Dockerfile (None if it can't be read)"""
+        try:
+            async with aiofiles.open(f"{project_path}/Dockerfile") as f:
+                dockerfile_text = await f.read()
+        except OSError:
+            return None
         
-        context_parts = []
-        if 'framework' in self.project_context:
-            context_parts.append(f"Framework: {self.project_context['framework']}")
-        if 'language' in self.project_context:
-            context_parts.append(f"Language: {self.project_context['language']}")
-        if 'deployed_service' in self.project_context:
-            context_parts.append(f"Deployed Service: {self.project_context['deployed_service']}")
-        if 'project_path' in self.project_context:
-            context_parts.append(f"Project Path: {self.project_context['project_path']}")
+        return self.security.scan_dockerfile_security(dockerfile_text)
+    
+    async def _embed_message(self, text: str) -> Optional[List[float]]:
+        """Embed a chat message for the semantic cache (None if unavailable)"""
+        try:
+            result = await genai.embed_content_async(
+                model=EMBEDDING_MODEL,
+                content=text,
+                task_type='semantic_similarity'
+            )
+            return result['embedding']
+        except Exception as e:
+            logger.warning("[Orchestrator] Embedding failed, bypassing cache: %s", e)
+            return None
+    
+    def _record_cached_turn(self, session: SessionState, message: str, reply: str):
+        """Append a cache-served exchange so the chat history stays complete"""
+        session.chat.history = [
+            *session.chat.history,
+            {'role': 'user', 'parts': [message]},
+            {'role': 'model', 'parts': [reply]}
+        ]
+    
+    def _record_function_turn(self, session: SessionState, function_names: List[str], results: List[Dict]):
+        """
+        Close a turn's function calls in the chat history without a Gemini
+        round-trip: the function responses, then the handlers' replies as
+        the model's turn
+        """
+        session.chat.history = [
+            *session.chat.history,
+            {'role': 'user', 'parts': [
+                {'function_response': {
+                    'name': name,
+                    'response': {'type': result.get('type'), 'content': result.get('content', '')}
+                }}
+                for name, result in zip(function_names, results)
+            ]},
+            {'role': 'model', 'parts': ['\n\n'.join(result.get('content', '') for result in results)]}
+        ]
+    
+    @staticmethod
+    def _merge_function_results(results: List[Dict]) -> Dict:
+        """Combine the results of same-turn function calls into one response"""
+        return {
+            'type': 'error' if all(result.get('type') == 'error' for result in results) else 'message',
+            'content': '\n\n---\n\n'.join(result.get('content', '') for result in results),
+            'data': {'results': results},
+            'actions': [action for result in results for action in result.get('actions', ())]
+        }
+    
+    def _record_usage(self, session: SessionState, response):
+        """Keep Gemini's own token count for the turn (system prompt + history + message)"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage:
+            session.history_tokens = usage.prompt_token_count
+            logger.debug("[Orchestrator] Prompt tokens: %s, total: %s", usage.prompt_token_count, usage.total_token_count)
+    
+    def _trim_chat_history(self, session: SessionState):
+        """Keep the chat session to a sliding window of recent messages"""
+        history = session.chat.history
+        if len(history) <= MAX_HISTORY_MESSAGES:
+            return
+        
+        # Start the window on a plain user message, never on a model turn or
+        # a function response whose call would be cut off
+        start = len(history) - MAX_HISTORY_MESSAGES
+        while start < len(history) and not (
+            history[start].role == 'user' and any(part.text for part in history[start].parts)
+        ):
+            start += 1
         
-        return "Current project context: " + ", ".join(context_parts) if context_parts else ""
+        session.chat.history = history[start:]
+        # The last context update may have been dropped; resend on next turn
+        session.sent_context = ''
+    
+    @property
+    def _session(self) -> SessionState:
+        """State of the session the current turn belongs to"""
+        return self._sessions.get(_current_session.get())
+    
+    @property
+    def project_context(self) -> ContextView:
+        """Read-only view of the current session's project context (write via update_context[_many])"""
+        return self._session.context_view
+    
+    async def warmup(self):
+        """
+        Open the Gemini connection before the first user message arrives.
+
+        count_tokens_async goes through the same async client as
+        send_message_async, so the channel setup is paid here instead of on
+        the first chat turn; it is also free and generates nothing.
+        """
+        try:
+            await self.model.count_tokens_async('ping')
+            logger.info("[Orchestrator] Gemini client warmed up")
+        except Exception as e:
+            logger.warning("[Orchestrator] Warmup failed (first request will be cold): %s", e)
+    
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        await self._http.aclose()
+    
+    def update_context(self, key: str, value: Any, session_id: Optional[str] = None) -> None:
+        """Update project context (of the current turn's session by default)"""
+        self._sessions.get(session_id or _current_session.get()).set_context(**{key: value})
     
-    def update_context(self, key: str, value: any):
-        """Update project context"""
-        self.project_context[key] = value
+    def update_context_many(self, updates: Mapping[str, Any], session_id: Optional[str] = None) -> None:
+        """Update several context fields, re-rendering the prefix at most once"""
+        self._sessions.get(session_id or _current_session.get()).set_context(**updates)
     
-    def get_context(self) -> Dict:
-        """Get current project context"""
-        return self.project_context
+    def get_context(self, session_id: Optional[str] = None) -> ContextView:
+        """Get project context (read-only view; write via update_context[_many])"""
+        return self._sessions.get(session_id or _current_session.get()).context_view
 
 
 # Test orchestrator with real services
 async def test_orchestrator():
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    
     orchestrator = OrchestratorAgent(
         gemini_api_key=os.getenv('GEMINI_API_KEY'),
         github_token=os.getenv('GITHUB_TOKEN'),
         gcloud_project=os.getenv('GOOGLE_CLOUD_PROJECT')
     )
     
-    test_messages = [
-        "List my GitHub repositories",
-        "Analyze my repo: https://github.com/user/flask-app",
-        "Deploy it to Cloud Run as my-flask-service"
+    # Independent conversations run concurrently as separate sessions;
+    # turns within one stay in order
+    conversations = [
+        ["List my GitHub repositories"],
+        [
+            "Analyze my repo: https://github.com/user/flask-app",
+            "Deploy it to Cloud Run as my-flask-service"
+        ]
     ]
     
-    for msg in test_messages:
-        print(f"\n{'='*60}")
-        print(f"🧑 USER: {msg}")
-        print(f"{'='*60}")
-        response = await orchestrator.process_message(msg, session_id="test-123")
-        print(f"🤖 SERVERGEM:\n{response['content']}")
+    async def run_conversation(index: int, messages: List[str]) -> List[tuple]:
+        results = []
+        for msg in messages:
+            response = await orchestrator.process_message(msg, session_id=f"test-{index}")
+            results.append((msg, response))
+        return results
+    
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(run_conversation(i, messages))
+            for i, messages in enumerate(conversations)
+        ]
+    await orchestrator.aclose()
+    
+    for task in tasks:
+        for msg, response in task.result():
+            print(f"\n{'='*60}")
+            print(f"🧑 USER: {msg}")
+            print(f"{'='*60}")
+            print(f"🤖 SERVERGEM:\n{response['content']}")
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
     asyncio.run(test_orchestrator())
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Semantic Cache - Reuse chat replies for near-duplicate messages
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-memory cache of chat replies keyed by message embedding.
+
+    A lookup hits when a live entry stored under the same context key has
+    cosine similarity >= threshold with the query. Embeddings are kept
+    normalized in one matrix, so a lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 600, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._entries: List[Tuple[str, float, Dict]] = []  # (context_key, expires_at, response)
+
+    def lookup(self, embedding: Sequence[float], context_key: str) -> Optional[Dict]:
+        """Return the cached reply for a similar message, if any"""
+
+        if not self._entries:
+            return None
+
+        now = time.monotonic()
+        live = np.fromiter(
+            (key == context_key and expires_at > now for key, expires_at, _ in self._entries),
+            dtype=bool,
+            count=len(self._entries)
+        )
+        scores = np.where(live, self._vectors @ self._normalize(embedding), -1.0)
+        best = int(np.argmax(scores))
+
+        return self._entries[best][2] if scores[best] >= self.threshold else None
+
+    def store(self, embedding: Sequence[float], context_key: str, response: Dict):
+        """Cache a reply, evicting expired and then oldest entries"""
+
+        now = time.monotonic()
+        keep = [i for i, (_, expires_at, _) in enumerate(self._entries) if expires_at > now]
+        keep = keep[-(self.max_entries - 1):] if self.max_entries > 1 else []
+
+        vector = self._normalize(embedding)[np.newaxis, :]
+        self._vectors = np.vstack([self._vectors[keep], vector]) if keep else vector
+        self._entries = [self._entries[i] for i in keep]
+        self._entries.append((context_key, now + self.ttl_seconds, response))
+
+    def clear(self):
+        """Drop all cached replies"""
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._entries = []
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -5,16 +5,22 @@ FastAPI server optimized for Google Cloud Run
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import sys
+import logging
+import logging.handlers
+import queue
 from dotenv import load_dotenv
 import asyncio
 from datetime import datetime
-import json
+import orjson
 
 from agents.orchestrator import OrchestratorAgent
 from services.deployment_service import deployment_service
+from services.deployment_progress import ProgressBatcher
 from services.user_service import user_service
 from services.usage_service import usage_service
 from middleware.usage_tracker import UsageTrackingMiddleware
@@ -22,10 +28,34 @@ from models import DeploymentStatus, PlanTier
 
 load_dotenv()
 
+
+def configure_logging() -> logging.handlers.QueueListener:
+    """
+    Route all log records through a queue to a background writer thread.
+
+    Request handlers only hand records to the queue; the blocking stdout
+    write happens on the listener thread, off the event loop.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
+log_listener = configure_logging()
+
 app = FastAPI(
     title="ServerGem API",
     description="AI-powered Cloud Run deployment assistant",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration for Cloud Run
@@ -51,6 +81,29 @@ orchestrator = OrchestratorAgent(
 )
 
 
+@app.on_event("startup")
+async def startup():
+    """Warm the Gemini client so the first chat message doesn't pay connection setup"""
+    await orchestrator.warmup()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled connections held by the orchestrator"""
+    await orchestrator.aclose()
+    log_listener.stop()
+
+
+async def send_json(websocket: WebSocket, payload: dict):
+    """Send a JSON text frame, encoding with orjson (datetimes serialize natively)"""
+    await websocket.send_text(orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode())
+
+
+async def receive_json(websocket: WebSocket) -> dict:
+    """Receive a JSON text frame, decoding with orjson"""
+    return orjson.loads(await websocket.receive_text())
+
+
 class ChatMessage(BaseModel):
     message: str
     session_id: str
@@ -99,7 +152,7 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
         
         # Receive initial connection message with session_id
-        init_message = await websocket.receive_json()
+        init_message = await receive_json(websocket)
         message_type = init_message.get('type')
         
         if message_type != 'init':
@@ -111,7 +164,7 @@ async def websocket_endpoint(websocket: WebSocket):
         active_connections[session_id] = websocket
         
         # Send connection confirmation
-        await websocket.send_json({
+        await send_json(websocket, {
             'type': 'connected',
             'session_id': session_id,
             'message': 'Connected to ServerGem AI - Ready to deploy!'
@@ -119,14 +172,14 @@ async def websocket_endpoint(websocket: WebSocket):
         
         # Message loop
         while True:
-            data = await websocket.receive_json()
+            data = await receive_json(websocket)
             msg_type = data.get('type')
             
             # Handle ping/pong heartbeat
             if msg_type == 'ping':
-                await websocket.send_json({
+                await send_json(websocket, {
                     'type': 'pong',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': datetime.now()
                 })
                 continue
             
@@ -137,37 +190,41 @@ async def websocket_endpoint(websocket: WebSocket):
                 if not message:
                     continue
                 
-                # Send typing indicator
-                await websocket.send_json({
-                    'type': 'typing',
-                    'timestamp': datetime.now().isoformat()
-                })
-                
                 # Progress callback for real-time updates
                 async def progress_callback(update):
                     """Stream progress updates via WebSocket"""
                     try:
                         # Check if connection is still open
                         if session_id in active_connections:
-                            await websocket.send_json(update)
+                            await send_json(websocket, update)
                     except Exception as e:
                         # Connection closed - silently handle
                         print(f"[WebSocket] Could not send progress update: {e}")
                         pass
                 
-                # Process message with orchestrator (with progress streaming)
-                response = await orchestrator.process_message(
-                    message,
-                    session_id,
-                    progress_callback=progress_callback
-                )
-                
-                # Send final response
-                await websocket.send_json({
-                    'type': 'message',
-                    'data': response,
-                    'timestamp': datetime.now().isoformat()
-                })
+                # Process message with orchestrator. Every frame of the turn
+                # (typing indicator, streamed reply text, progress and the
+                # final response) goes through one batcher, so updates that
+                # land together share a frame; a fast reply arrives in the
+                # same frame as its typing indicator
+                async with ProgressBatcher(progress_callback) as batched_callback:
+                    await batched_callback({
+                        'type': 'typing',
+                        'timestamp': datetime.now()
+                    })
+                    
+                    response = await orchestrator.process_message_stream(
+                        message,
+                        session_id,
+                        progress_callback=batched_callback
+                    )
+                    
+                    # Send final response (flushed on exit)
+                    await batched_callback({
+                        'type': 'message',
+                        'data': response,
+                        'timestamp': datetime.now()
+                    })
     
     except WebSocketDisconnect:
         if session_id and session_id in active_connections:
@@ -178,10 +235,10 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"WebSocket error for session {session_id}: {str(e)}")
         if session_id and session_id in active_connections:
             try:
-                await websocket.send_json({
+                await send_json(websocket, {
                     'type': 'error',
                     'message': str(e),
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': datetime.now()
                 })
             except:
                 pass
@@ -3,25 +3,32 @@ ServerGem Services - Production-Grade Service Layer
 FAANG-level implementation with monitoring, security, and optimization
 """
 
-from .github_service import GitHubService
-from .gcloud_service import GCloudService
-from .docker_service import DockerService
-from .analysis_service import AnalysisService
+import importlib
 
-# Production services
-from .monitoring import MonitoringService, monitoring
-from .security import SecurityService, security
-from .optimization import OptimizationService, optimization
+# Exports are resolved on first access, so importing one submodule (e.g.
+# services.deployment_progress) doesn't load the whole service layer,
+# including the Gemini analysis stack
+_EXPORTS = {
+    'GitHubService': 'github_service',
+    'GCloudService': 'gcloud_service',
+    'DockerService': 'docker_service',
+    'AnalysisService': 'analysis_service',
+    # Production services
+    'MonitoringService': 'monitoring',
+    'monitoring': 'monitoring',
+    'SecurityService': 'security',
+    'security': 'security',
+    'OptimizationService': 'optimization',
+    'optimization': 'optimization',
+}
 
-__all__ = [
-    'GitHubService',
-    'GCloudService',
-    'DockerService',
-    'AnalysisService',
-    'MonitoringService',
-    'monitoring',
-    'SecurityService',
-    'security',
-    'OptimizationService',
-    'optimization',
-]
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
@@ -4,7 +4,7 @@ Integrates CodeAnalyzer with real project paths
 """
 
 from pathlib import Path
-from typing import Dict
+from typing import Awaitable, Callable, Dict, Optional
 from agents.code_analyzer import CodeAnalyzerAgent
 from agents.docker_expert import DockerExpertAgent
 
@@ -13,20 +13,28 @@ class AnalysisService:
     """Orchestrates code analysis and Dockerfile generation"""
     
     def __init__(self, gemini_api_key: str):
-        self.code_analyzer = CodeAnalyzerAgent(gemini_api_key)
+        # Analyses are triggered from chat, so a user is waiting on them
+        self.code_analyzer = CodeAnalyzerAgent(gemini_api_key, service_tier='priority')
         self.docker_expert = DockerExpertAgent(gemini_api_key)
     
-    async def analyze_and_generate(self, project_path: str) -> Dict:
+    async def analyze_and_generate(
+        self,
+        project_path: str,
+        on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> Dict:
         """
         Full analysis workflow:
         1. Analyze codebase
         2. Generate Dockerfile
         3. Return comprehensive report
+        
+        on_partial receives the detected language/framework early, while
+        the rest of the analysis is still streaming.
         """
         try:
             # Step 1: Analyze project
             print(f"[AnalysisService] Analyzing project at {project_path}")
-            analysis = await self.code_analyzer.analyze_project(project_path)
+            analysis = await self.code_analyzer.analyze_project(project_path, on_partial=on_partial)
             
             if 'error' in analysis:
                 return {
@@ -5,6 +5,7 @@ FAANG-Level Implementation - Structured Progress Updates for Real-time UI
 
 from typing import Optional, Dict, List, Callable
 from datetime import datetime
+from contextlib import asynccontextmanager
 import asyncio
 
 class DeploymentProgressTracker:
@@ -20,6 +21,7 @@ class DeploymentProgressTracker:
         self.start_time = datetime.now()
         self.stages: Dict[str, Dict] = {}
         self.current_progress = 0
+        self._batch: Optional[List[Dict]] = None  # Buffered updates while inside batch()
         
     async def emit(self, message: str, stage: Optional[str] = None, progress: Optional[int] = None):
         """
@@ -33,25 +35,54 @@ class DeploymentProgressTracker:
         if progress is not None:
             self.current_progress = progress
             
-        # Emit structured message with error handling for disconnected clients
-        try:
-            await self.progress_callback({
-                'type': 'message',
-                'data': {
-                    'content': message,
-                    'timestamp': datetime.now().isoformat(),
-                    'metadata': {
-                        'deployment_id': self.deployment_id,
-                        'service_name': self.service_name,
-                        'stage': stage,
-                        'progress': self.current_progress
-                    }
+        update = {
+            'type': 'message',
+            'data': {
+                'content': message,
+                'timestamp': datetime.now(),
+                'metadata': {
+                    'deployment_id': self.deployment_id,
+                    'service_name': self.service_name,
+                    'stage': stage,
+                    'progress': self.current_progress
                 }
-            })
+            }
+        }
+        
+        if self._batch is not None:
+            self._batch.append(update)
+            return
+        
+        await self._send(update)
+    
+    async def _send(self, update: Dict):
+        """Send one frame, tolerating disconnected clients"""
+        try:
+            await self.progress_callback(update)
         except Exception as e:
             # Gracefully handle disconnected clients
             print(f"[DeploymentProgress] Warning: Could not emit progress: {e}")
-            pass
+    
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Buffer emits made inside the block and send them as one frame on exit.
+        
+        Several updates go out as {'type': 'batch', 'messages': [...]} (the
+        frame the WebSocket client already unpacks); a lone update is sent
+        unchanged. Nested batches join the outermost one.
+        """
+        if self._batch is not None:
+            yield self
+            return
+        
+        self._batch = []
+        try:
+            yield self
+        finally:
+            pending, self._batch = self._batch, None
+            if pending and self.progress_callback:
+                await self._send(pending[0] if len(pending) == 1 else {'type': 'batch', 'messages': pending})
     
     # ========================================================================
     # STAGE 1: Repository Access
@@ -323,6 +354,114 @@ class DeploymentProgressTracker:
         await self.emit(message, stage=stage)
 
 
+
+# ============================================================================
+# WebSocket Frame Coalescing
+# ============================================================================
+
+class ProgressBatcher:
+    """
+    Coalesces progress updates into fewer WebSocket frames.
+    
+    Updates are queued and flushed every `interval` seconds, or as soon as
+    the stage changes, as one {'type': 'batch', 'messages': [...]} frame; a
+    lone update is sent unchanged. Consecutive duplicate progress messages
+    are dropped. Use as an async context manager so the tail is flushed
+    before the final response is sent.
+    """
+    
+    def __init__(self, send: Callable, interval: float = 0.05, max_batch: int = 32):
+        self.send = send
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._flusher: Optional[asyncio.Task] = None
+    
+    async def __aenter__(self) -> 'ProgressBatcher':
+        self._flusher = asyncio.create_task(self._run())
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self._queue.put_nowait(None)  # Flush remaining updates and stop
+        await self._flusher
+    
+    async def __call__(self, update: Dict):
+        """Queue an update (drop-in replacement for a progress callback)"""
+        # Unpack frames a tracker already batched so they coalesce (and
+        # dedupe) with their neighbours instead of nesting
+        if update.get('type') == 'batch':
+            for message in update['messages']:
+                self._queue.put_nowait(message)
+        else:
+            self._queue.put_nowait(update)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        pending: List[Dict] = []
+        deadline = 0.0
+        getter = None
+        
+        while True:
+            if getter is None:
+                getter = asyncio.ensure_future(self._queue.get())
+            
+            timeout = max(0.0, deadline - loop.time()) if pending else None
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+            if not done:
+                await self._flush(pending)
+                pending = []
+                continue
+            
+            update = getter.result()
+            getter = None
+            
+            if update is None:
+                await self._flush(pending)
+                return
+            
+            if pending:
+                if self._stage(update) != self._stage(pending[-1]):
+                    await self._flush(pending)
+                    pending = []
+                elif self._dedupe_key(update) is not None and self._dedupe_key(update) == self._dedupe_key(pending[-1]):
+                    continue
+            
+            if not pending:
+                deadline = loop.time() + self.interval
+            pending.append(update)
+            
+            if len(pending) >= self.max_batch:
+                await self._flush(pending)
+                pending = []
+    
+    async def _flush(self, pending: List[Dict]):
+        if not pending:
+            return
+        if len(pending) == 1:
+            await self.send(pending[0])
+        else:
+            await self.send({'type': 'batch', 'messages': list(pending)})
+    
+    @staticmethod
+    def _metadata(update: Dict) -> Dict:
+        data = update.get('data')
+        return (data.get('metadata') or {}) if isinstance(data, dict) else {}
+    
+    @classmethod
+    def _stage(cls, update: Dict) -> Optional[str]:
+        return cls._metadata(update).get('stage')
+    
+    @classmethod
+    def _dedupe_key(cls, update: Dict) -> Optional[tuple]:
+        """(content, stage, progress) for tracker messages, None otherwise"""
+        if update.get('type') != 'message' or not isinstance(update.get('data'), dict):
+            return None
+        metadata = cls._metadata(update)
+        if not metadata:
+            return None  # A final reply, not a tracker message
+        return (update['data'].get('content'), metadata.get('stage'), metadata.get('progress'))
+
+
 # ============================================================================
 # Convenience Function
 # ============================================================================
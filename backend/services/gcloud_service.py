@@ -10,7 +10,6 @@ FAANG-level implementation with:
 
 import os
 import json
-import subprocess
 from typing import Dict, List, Optional, Callable, Any
 from pathlib import Path
 import asyncio
@@ -461,7 +460,7 @@ class GCloudService:
                 'error': f'Failed to create secret: {str(e)}'
             }
     
-    def get_service_logs(self, service_name: str, limit: int = 50) -> List[str]:
+    async def get_service_logs(self, service_name: str, limit: int = 50) -> List[str]:
         """Fetch recent logs from Cloud Run service"""
         try:
             cmd = [
@@ -472,18 +471,24 @@ class GCloudService:
                 '--format', 'value(textPayload)'
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
             
-            if result.returncode == 0:
-                logs = [line for line in result.stdout.split('\n') if line.strip()]
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise
+            
+            if process.returncode == 0:
+                logs = [line for line in stdout.decode().split('\n') if line.strip()]
                 return logs
             else:
-                return [f'Failed to fetch logs: {result.stderr}']
+                return [f'Failed to fetch logs: {stderr.decode()}']
                 
         except Exception as e:
             return [f'Log fetch error: {str(e)}']
@@ -8,20 +8,39 @@ import shutil
 import subprocess
 from pathlib import Path
 from typing import Dict, List, Optional
-import requests
+import httpx
 from datetime import datetime
 
 
+def _tree_stats(root: Path) -> tuple:
+    """(entry count, total file bytes) under root in one scandir walk"""
+    entries = 0
+    total_bytes = 0
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                entries += 1
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    total_bytes += entry.stat().st_size
+    return entries, total_bytes
+
+
 class GitHubService:
     """Production-grade GitHub integration service"""
     
-    def __init__(self, github_token: Optional[str] = None):
+    def __init__(self, github_token: Optional[str] = None, http_client: Optional[httpx.AsyncClient] = None):
         self.token = github_token or os.getenv('GITHUB_TOKEN')
+        # Shared keep-alive client (owned by the caller when injected)
+        self.http = http_client or httpx.AsyncClient()
         self.base_url = 'https://api.github.com'
+        self._etags: Dict[str, tuple] = {}  # endpoint -> (ETag, parsed repos)
         self.workspace_dir = Path('/tmp/servergem_repos')
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
         
-    def validate_token(self) -> Dict:
+    async def validate_token(self) -> Dict:
         """Validate GitHub token and return user info"""
         if not self.token:
             return {'valid': False, 'error': 'No GitHub token provided'}
@@ -32,7 +51,7 @@ class GitHubService:
         }
         
         try:
-            response = requests.get(f'{self.base_url}/user', headers=headers, timeout=10)
+            response = await self.http.get(f'{self.base_url}/user', headers=headers, timeout=10)
             
             if response.status_code == 200:
                 user_data = response.json()
@@ -49,7 +68,7 @@ class GitHubService:
         except Exception as e:
             return {'valid': False, 'error': f'Validation failed: {str(e)}'}
     
-    def list_repositories(self, username: Optional[str] = None) -> List[Dict]:
+    async def list_repositories(self, username: Optional[str] = None) -> List[Dict]:
         """List user's repositories"""
         if not self.token:
             raise ValueError('GitHub token required')
@@ -62,16 +81,26 @@ class GitHubService:
         try:
             # Get authenticated user's repos
             endpoint = f'{self.base_url}/user/repos' if not username else f'{self.base_url}/users/{username}/repos'
-            response = requests.get(
+            
+            # Conditional request: an unchanged listing comes back as an empty
+            # 304, which GitHub does not count against the rate limit
+            cached = self._etags.get(endpoint)
+            if cached:
+                headers['If-None-Match'] = cached[0]
+            
+            response = await self.http.get(
                 endpoint,
                 headers=headers,
                 params={'sort': 'updated', 'per_page': 100},
                 timeout=10
             )
             
+            if response.status_code == 304 and cached:
+                return cached[1]
+            
             if response.status_code == 200:
                 repos = response.json()
-                return [{
+                parsed = [{
                     'name': repo['name'],
                     'full_name': repo['full_name'],
                     'description': repo.get('description', ''),
@@ -82,6 +111,11 @@ class GitHubService:
                     'updated_at': repo['updated_at'],
                     'private': repo['private']
                 } for repo in repos]
+                
+                etag = response.headers.get('ETag')
+                if etag:
+                    self._etags[endpoint] = (etag, parsed)
+                return parsed
             else:
                 raise Exception(f'Failed to fetch repos: {response.status_code}')
                 
@@ -143,9 +177,9 @@ class GitHubService:
             if not local_path.exists() or not (local_path / '.git').exists():
                 raise Exception("Repository clone verification failed")
             
-            # Get repo info
-            files_count = len(list(local_path.rglob('*')))
-            size_mb = sum(f.stat().st_size for f in local_path.rglob('*') if f.is_file()) / (1024 * 1024)
+            # Get repo info (one walk for both numbers)
+            files_count, size_bytes = _tree_stats(local_path)
+            size_mb = size_bytes / (1024 * 1024)
             
             return {
                 'success': True,
@@ -6,10 +6,22 @@ import os
 import hashlib
 import hmac
 import secrets
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import re
 
 
+SENSITIVE_PATTERNS = (
+    r'(?i)(password|passwd|pwd|secret|token|key|api[-_]?key)',
+    r'(?i)(authorization|auth)',
+    r'(?i)(credential|cred)',
+)
+
+# Per-pattern regexes plus one alternation used as a single-pass prefilter
+SENSITIVE_REGEXES = tuple(re.compile(pattern) for pattern in SENSITIVE_PATTERNS)
+SENSITIVE_REGEX = re.compile('|'.join(f'(?:{pattern[4:]})' for pattern in SENSITIVE_PATTERNS), re.IGNORECASE)
+ENV_VAR_NAME_REGEX = re.compile(r'^[A-Z_][A-Z0-9_]*$')
+
+
 class SecurityService:
     """
     Production security service
@@ -23,11 +35,7 @@ class SecurityService:
     """
     
     def __init__(self):
-        self.sensitive_patterns = [
-            r'(?i)(password|passwd|pwd|secret|token|key|api[-_]?key)',
-            r'(?i)(authorization|auth)',
-            r'(?i)(credential|cred)',
-        ]
+        self.sensitive_patterns = list(SENSITIVE_PATTERNS)
     
     def sanitize_logs(self, text: str) -> str:
         """Remove sensitive information from logs"""
@@ -50,7 +58,7 @@ class SecurityService:
         
         return sanitized
     
-    def validate_service_name(self, name: str) -> Dict[str, any]:
+    def validate_service_name(self, name: str) -> Dict[str, Any]:
         """
         Validate Cloud Run service name
         
@@ -84,12 +92,12 @@ class SecurityService:
         
         for key, value in env_vars.items():
             # Check key format
-            if not re.match(r'^[A-Z_][A-Z0-9_]*$', key):
+            if not ENV_VAR_NAME_REGEX.match(key):
                 issues.append(f"Invalid env var name: {key}")
                 continue
             
             # Check for hardcoded secrets (warning)
-            if any(re.search(pattern, key) for pattern in self.sensitive_patterns):
+            if SENSITIVE_REGEX.search(key):
                 issues.append(f"WARNING: {key} appears to be sensitive - use Secret Manager")
             
             sanitized[key] = value
@@ -120,33 +128,38 @@ class SecurityService:
         issues = []
         recommendations = []
         
-        lines = dockerfile_content.split('\n')
+        has_user_instruction = False
+        has_wildcard_copy = False
+        latest_tags = []
+        interactive_installs = []
+        
+        # Single pass over the Dockerfile; issue order matches the per-check scans
+        for line in dockerfile_content.split('\n'):
+            if 'USER ' in line:
+                has_user_instruction = True
+            if 'COPY * ' in line or 'COPY . ' in line:
+                has_wildcard_copy = True
+            if 'ENV' in line and SENSITIVE_REGEX.search(line):
+                # One issue per matching pattern, as before
+                issues.extend(
+                    f"Potential secret in ENV: {line[:50]}"
+                    for regex in SENSITIVE_REGEXES if regex.search(line)
+                )
+            if 'FROM' in line and ':latest' in line:
+                latest_tags.append("Pin base image versions instead of using :latest")
+            if 'apt-get' in line and '-y' not in line and 'update' not in line:
+                interactive_installs.append("Use 'apt-get -y' for non-interactive installs")
         
         # Check for root user
-        has_user_instruction = any('USER ' in line for line in lines)
         if not has_user_instruction:
-            issues.append("Running as root - add 'USER' instruction")
+            issues.insert(0, "Running as root - add 'USER' instruction")
         
         # Check for COPY with wildcard
-        if any('COPY * ' in line or 'COPY . ' in line for line in lines):
+        if has_wildcard_copy:
             recommendations.append("Use specific COPY commands instead of wildcards")
         
-        # Check for exposed secrets
-        for line in lines:
-            if 'ENV' in line:
-                for pattern in self.sensitive_patterns:
-                    if re.search(pattern, line):
-                        issues.append(f"Potential secret in ENV: {line[:50]}")
-        
-        # Check for latest tag
-        for line in lines:
-            if 'FROM' in line and ':latest' in line:
-                recommendations.append("Pin base image versions instead of using :latest")
-        
-        # Check for apt-get without -y
-        for line in lines:
-            if 'apt-get' in line and '-y' not in line and 'update' not in line:
-                recommendations.append("Use 'apt-get -y' for non-interactive installs")
+        recommendations.extend(latest_tags)
+        recommendations.extend(interactive_installs)
         
         return {
             'secure': len(issues) == 0,
@@ -46,7 +46,7 @@ export const useChat = (): UseChatReturn => {
     content: string;
     actions?: any[];
     metadata?: Record<string, any>;
-  }) => {
+  }, replaceStreaming = false) => {
     const message: ChatMessage = {
       id: `msg_${Date.now()}`,
       role: 'assistant',
@@ -56,7 +56,37 @@ export const useChat = (): UseChatReturn => {
       metadata: data.metadata,
     };
     
-    setMessages(prev => [...prev, message]);
+    // The turn's final reply replaces the text streamed so far; any other
+    // message ends the streamed one and is added after it
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last?.metadata?.type !== 'streaming') {
+        return [...prev, message];
+      }
+      if (replaceStreaming) {
+        return [...prev.slice(0, -1), message];
+      }
+      const finished = { ...last, metadata: { ...last.metadata, type: 'message' } };
+      return [...prev.slice(0, -1), finished, message];
+    });
+  }, []);
+  
+  const appendStreamingDelta = useCallback((content: string) => {
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last?.metadata?.type === 'streaming') {
+        return [...prev.slice(0, -1), { ...last, content: last.content + content }];
+      }
+      
+      const message: ChatMessage = {
+        id: `msg_${Date.now()}`,
+        role: 'assistant',
+        content,
+        timestamp: new Date(),
+        metadata: { type: 'streaming' },
+      };
+      return [...prev, message];
+    });
   }, []);
   
   const addAnalysisMessage = useCallback((data: any) => {
@@ -206,11 +236,18 @@ export const useChat = (): UseChatReturn => {
           updateDeploymentStage(serverMessage.data.content);
         }
         
+        // Deployment progress carries tracker metadata; only the turn's
+        // final reply (no deployment_id) replaces streamed text
         addAssistantMessage({
           content: serverMessage.data.content,
           actions: serverMessage.data.actions,
           metadata: serverMessage.data.metadata,
-        });
+        }, !serverMessage.data.metadata?.deployment_id);
+        break;
+        
+      case 'message_delta':
+        setIsTyping(false);
+        appendStreamingDelta(serverMessage.content);
         break;
         
       case 'analysis':
@@ -264,7 +301,7 @@ export const useChat = (): UseChatReturn => {
       default:
         console.warn('[useChat] Unknown message type:', serverMessage);
     }
-  }, [addAssistantMessage, addAnalysisMessage, updateDeploymentProgress, addDeploymentCompleteMessage, handleErrorMessage, updateDeploymentStage, deploymentProgress]);
+  }, [addAssistantMessage, appendStreamingDelta, addAnalysisMessage, updateDeploymentProgress, addDeploymentCompleteMessage, handleErrorMessage, updateDeploymentStage, deploymentProgress]);
   
   useEffect(() => {
     const unsubscribe = onMessage((serverMessage: ServerMessage) => {
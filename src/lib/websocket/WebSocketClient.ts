@@ -11,6 +11,7 @@
 import { 
   ClientMessage, 
   ServerMessage, 
+  ServerBatchMessage,
   ConnectionState,
   ConnectionStatus,
   WebSocketConfig,
@@ -213,23 +214,12 @@ export class WebSocketClient {
   
   private handleMessage(event: MessageEvent): void {
     try {
-      const message: ServerMessage = JSON.parse(event.data);
+      const message: ServerMessage | ServerBatchMessage = JSON.parse(event.data);
       console.log('[WebSocket] Received message:', message.type);
       
-      // Handle pong for heartbeat
-      if (message.type === 'pong') {
-        this.handlePong();
-        return;
-      }
-      
-      // Emit to all message handlers
-      this.eventHandlers.message.forEach(handler => {
-        try {
-          handler(message);
-        } catch (error) {
-          console.error('[WebSocket] Message handler error:', error);
-        }
-      });
+      // Coalesced progress frames are delivered to handlers one by one
+      const messages = message.type === 'batch' ? message.messages : [message];
+      messages.forEach(item => this.dispatchMessage(item));
       
     } catch (error) {
       console.error('[WebSocket] Message parse error:', error);
@@ -237,6 +227,23 @@ export class WebSocketClient {
     }
   }
   
+  private dispatchMessage(message: ServerMessage): void {
+    // Handle pong for heartbeat
+    if (message.type === 'pong') {
+      this.handlePong();
+      return;
+    }
+    
+    // Emit to all message handlers
+    this.eventHandlers.message.forEach(handler => {
+      try {
+        handler(message);
+      } catch (error) {
+        console.error('[WebSocket] Message handler error:', error);
+      }
+    });
+  }
+  
   private handleError(event: Event): void {
     console.error('[WebSocket] WebSocket error:', event);
     const error = new Error('WebSocket connection error');
@@ -32,11 +32,13 @@ export type ServerMessageType =
   | 'connected'           // Initial connection confirmation
   | 'typing'              // AI is processing
   | 'message'             // AI response message
+  | 'message_delta'       // Partial AI response text while streaming
   | 'analysis'            // Code analysis result
   | 'deployment_update'   // Deployment progress update
   | 'deployment_complete' // Deployment finished
   | 'error'               // Error occurred
-  | 'pong';               // Heartbeat response
+  | 'pong'                // Heartbeat response
+  | 'batch';              // Coalesced progress frames (unpacked by WebSocketClient)
 
 export type ClientMessageType =
   | 'init'                // Initialize connection
@@ -99,6 +101,15 @@ export interface ServerChatMessage {
   timestamp: string;
 }
 
+/**
+ * A chunk of reply text streamed while the AI is generating; the complete
+ * reply follows as a regular 'message'.
+ */
+export interface ServerMessageDelta {
+  type: 'message_delta';
+  content: string;
+}
+
 export interface ServerAnalysisMessage {
   type: 'analysis';
   data: {
@@ -149,10 +160,20 @@ export interface ServerPongMessage {
   timestamp: string;
 }
 
+/**
+ * Several progress updates sent as one frame. WebSocketClient unpacks these,
+ * so message handlers only ever see the individual messages.
+ */
+export interface ServerBatchMessage {
+  type: 'batch';
+  messages: ServerMessage[];
+}
+
 export type ServerMessage = 
   | ServerConnectedMessage
   | ServerTypingMessage
   | ServerChatMessage
+  | ServerMessageDelta
   | ServerAnalysisMessage
   | ServerDeploymentUpdate
   | ServerDeploymentComplete